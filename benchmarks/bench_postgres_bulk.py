@@ -0,0 +1,88 @@
+"""Compare per-row upserts with the COPY bulk path of PostgresDatabaseClient.
+
+Uses the same POSTGRES_* environment variables as the service and writes
+synthetic vulnerability reports under a dedicated resource type, which is
+removed again afterwards.
+
+    python benchmarks/bench_postgres_bulk.py --sizes 10000 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from database import PostgresDatabaseClient  # noqa: E402
+
+RESOURCE_TYPE = "benchmark-vulnerabilityreports"
+
+
+def make_rows(count: int, prefix: str) -> list[tuple[str, str, dict]]:
+    vulnerabilities = [
+        {"vulnerabilityID": f"CVE-2024-{i:05d}", "severity": "HIGH", "resource": "openssl", "installedVersion": "3.0.1"}
+        for i in range(20)
+    ]
+    return [
+        (
+            RESOURCE_TYPE,
+            f"{prefix}-{i}",
+            {
+                "_event_type": "ADDED",
+                "_resource_type": RESOURCE_TYPE,
+                "_namespace": f"ns-{i % 50}",
+                "_name": f"report-{i}",
+                "_cluster": "benchmark",
+                "data": {"report": {"vulnerabilities": vulnerabilities}},
+            },
+        )
+        for i in range(count)
+    ]
+
+
+def cleanup(client: PostgresDatabaseClient) -> None:
+    with client.conn.cursor() as cur:
+        cur.execute("DELETE FROM resources WHERE resource_type = %s", (RESOURCE_TYPE,))
+
+
+def bench_per_row(client: PostgresDatabaseClient, rows) -> float:
+    start = time.perf_counter()
+    for resource_type, uid, doc in rows:
+        if not client.upsert_resource(resource_type, uid, doc):
+            raise RuntimeError(f"Upsert of {uid} failed")
+    return time.perf_counter() - start
+
+
+def bench_bulk(client: PostgresDatabaseClient, rows) -> float:
+    start = time.perf_counter()
+    if not client.bulk_upsert_resources(rows):
+        raise RuntimeError("Bulk upsert failed")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = PostgresDatabaseClient()
+    client.connect()
+    try:
+        print(f"{'rows':>8} {'path':>8} {'seconds':>9} {'rows/sec':>10}")
+        for size in args.sizes:
+            for name, bench in (("per-row", bench_per_row), ("copy", bench_bulk)):
+                cleanup(client)
+                # Fresh uids per run so both paths measure inserts into an empty range
+                elapsed = bench(client, make_rows(size, f"{name}-{size}"))
+                print(f"{size:>8} {name:>8} {elapsed:>9.2f} {size / elapsed:>10.0f}")
+        cleanup(client)
+    finally:
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
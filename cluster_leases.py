@@ -0,0 +1,247 @@
+"""Cluster heartbeat leases and expiry of data from abandoned clusters.
+
+Every SyncResource/SyncNamespace call and every Heartbeat RPC renews the lease
+of the sending cluster. When a cluster has not been seen for
+CLUSTER_LEASE_TTL_SECONDS, the background sweeper deletes its documents in
+batches of CLUSTER_SWEEP_BATCH_SIZE, pausing CLUSTER_SWEEP_BATCH_DELAY_SECONDS
+between batches so live ingest keeps priority, and finally drops the lease.
+
+The sweeper only runs when CLUSTER_LEASE_TTL_SECONDS is set. With
+CLUSTER_SWEEP_DRY_RUN=true it logs what it would delete instead. Clusters that
+have data but no lease, such as clusters decommissioned before leases were
+recorded, get a lease starting at the first sweep and expire one TTL later.
+Dry runs and reports only list such clusters and do not write leases.
+
+Run this module directly for a one-off report, or with --purge to sweep now:
+
+    python cluster_leases.py --ttl-seconds 604800
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger("grpc-receiver")
+
+
+class ClusterLeaseTracker:
+
+    """Renews cluster leases from incoming traffic.
+
+    Writes are throttled to one per cluster every `refresh_seconds` so that
+    lease bookkeeping does not add a database write to every request.
+    """
+
+    def __init__(self, client, refresh_seconds: float | None = None):
+        self.client = client
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else float(os.getenv("CLUSTER_LEASE_REFRESH_SECONDS", "60"))
+        )
+        self._last_renewed: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, cluster: str) -> None:
+        """Renew the lease of `cluster` unless it was renewed recently."""
+        if not cluster:
+            return
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_renewed.get(cluster)
+            if last is not None and now - last < self.refresh_seconds:
+                return
+            # Claim the renewal so concurrent requests do not all write
+            self._last_renewed[cluster] = now
+        if not self._renew(cluster):
+            with self._lock:
+                self._last_renewed.pop(cluster, None)
+
+    def heartbeat(self, cluster: str) -> bool:
+        """Renew the lease of `cluster` immediately."""
+        renewed = self._renew(cluster)
+        if renewed:
+            with self._lock:
+                self._last_renewed[cluster] = time.monotonic()
+        return renewed
+
+    def _renew(self, cluster: str) -> bool:
+        # Lease bookkeeping must never fail the request that triggered it
+        try:
+            return self.client.touch_cluster(cluster)
+        except Exception as e:
+            logger.warning(f"Failed to renew lease for cluster {cluster}: {e}")
+            return False
+
+
+class ClusterSweeper:
+
+    """Purges the documents of clusters whose lease has expired."""
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds: float | None = None,
+        batch_size: int | None = None,
+        batch_delay: float | None = None,
+        interval: float | None = None,
+        dry_run: bool | None = None,
+    ):
+        self.client = client
+        if ttl_seconds is None and os.getenv("CLUSTER_LEASE_TTL_SECONDS"):
+            ttl_seconds = float(os.environ["CLUSTER_LEASE_TTL_SECONDS"])
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size or int(os.getenv("CLUSTER_SWEEP_BATCH_SIZE", "500"))
+        self.batch_delay = (
+            batch_delay if batch_delay is not None else float(os.getenv("CLUSTER_SWEEP_BATCH_DELAY_SECONDS", "1"))
+        )
+        self.interval = interval or float(os.getenv("CLUSTER_SWEEP_INTERVAL_SECONDS", "3600"))
+        if dry_run is None:
+            dry_run = os.getenv("CLUSTER_SWEEP_DRY_RUN", "false").lower() in ("1", "true", "yes")
+        self.dry_run = dry_run
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._adopted = False
+
+    def unleased_clusters(self) -> list[str]:
+        """Clusters that have data but no lease."""
+        return sorted(self.client.list_data_clusters() - set(self.client.list_cluster_leases()))
+
+    def adopt_unleased_clusters(self, now: datetime | None = None) -> list[str]:
+        """Give clusters that have data but no lease a lease starting `now`."""
+        now = now or datetime.now(timezone.utc)
+        adopted = [cluster for cluster in self.unleased_clusters() if self.client.add_cluster_lease(cluster, now)]
+        if adopted:
+            logger.info(f"Started leases for {len(adopted)} clusters without one: {', '.join(adopted)}")
+        self._adopted = True
+        return adopted
+
+    def expired_clusters(self, now: datetime | None = None) -> dict[str, datetime]:
+        if self.ttl_seconds is None:
+            return {}
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=self.ttl_seconds)
+        return {cluster: seen for cluster, seen in self.client.list_cluster_leases().items() if seen < cutoff}
+
+    def report(self) -> list[dict]:
+        """Describe what a sweep would do, without changing anything.
+
+        Clusters without a lease are listed with `last_seen` None: a sweep
+        would give them a lease rather than delete their data.
+        """
+        expired = [
+            {
+                "cluster": cluster,
+                "last_seen": last_seen.isoformat(),
+                "documents": self.client.count_cluster_documents(cluster),
+            }
+            for cluster, last_seen in sorted(self.expired_clusters().items())
+        ]
+        unleased = []
+        if not self._adopted:
+            unleased = [
+                {"cluster": cluster, "last_seen": None, "documents": self.client.count_cluster_documents(cluster)}
+                for cluster in self.unleased_clusters()
+            ]
+        return expired + unleased
+
+    def sweep(self) -> dict[str, int]:
+        """Purge every expired cluster and return the documents deleted per cluster."""
+        if self.dry_run:
+            for entry in self.report():
+                if entry["last_seen"] is None:
+                    logger.info(
+                        f"[dry-run] Cluster {entry['cluster']} has {entry['documents']} documents but no lease, "
+                        f"would get a lease"
+                    )
+                else:
+                    logger.info(
+                        f"[dry-run] Would purge {entry['documents']} documents of cluster {entry['cluster']} "
+                        f"(last seen {entry['last_seen']})"
+                    )
+            return {}
+
+        if not self._adopted:
+            self.adopt_unleased_clusters()
+        purged = {}
+        for cluster in self.expired_clusters():
+            if self._stop.is_set():
+                break
+            purged[cluster] = self._purge_cluster(cluster)
+        return purged
+
+    def _purge_cluster(self, cluster: str) -> int:
+        total = 0
+        while not self._stop.is_set():
+            # The cluster may have come back while we were sweeping it
+            if cluster not in self.expired_clusters():
+                logger.info(f"Cluster {cluster} renewed its lease, stopping purge after {total} documents")
+                return total
+            deleted = self.client.purge_cluster_batch(cluster, self.batch_size)
+            total += deleted
+            if deleted == 0:
+                self.client.delete_cluster_lease(cluster)
+                logger.info(f"Purged {total} documents of expired cluster {cluster}")
+                return total
+            self._stop.wait(self.batch_delay)
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Cluster sweep failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cluster-sweeper", daemon=True)
+        self._thread.start()
+        mode = " (dry-run)" if self.dry_run else ""
+        logger.info(f"Cluster sweeper started{mode}, lease TTL {self.ttl_seconds:g}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from database import DatabaseFactory
+
+    parser = argparse.ArgumentParser(description="Report or purge data of clusters with expired leases")
+    parser.add_argument("--ttl-seconds", type=float, help="Lease TTL (default: CLUSTER_LEASE_TTL_SECONDS)")
+    parser.add_argument("--purge", action="store_true", help="Delete the data instead of only reporting it")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    client = DatabaseFactory.create_client()
+    client.connect()
+    try:
+        sweeper = ClusterSweeper(client, ttl_seconds=args.ttl_seconds, dry_run=not args.purge)
+        if sweeper.ttl_seconds is None:
+            parser.error("No lease TTL given, pass --ttl-seconds or set CLUSTER_LEASE_TTL_SECONDS")
+        if args.purge:
+            for cluster, deleted in sweeper.sweep().items():
+                print(f"{cluster}\tpurged {deleted} documents")
+        else:
+            for entry in sweeper.report():
+                last_seen = entry["last_seen"] or "never (would get a lease)"
+                print(f"{entry['cluster']}\tlast seen {last_seen}\t{entry['documents']} documents")
+    finally:
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
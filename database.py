@@ -10,30 +10,114 @@ This keeps the interface used in the service:
 - delete_resource(resource_type, uid)
 - upsert_namespace(uid, doc)
 - delete_namespace(uid)
+- bulk_upsert_resources(rows) / bulk_upsert_namespaces(rows) for initial syncs
+- list_resource_types(), iter_resources(resource_type), iter_namespaces() for exports
+- get_resource(resource_type, uid)
+
+With DEDUP_REPORTS=true large report sections are stored once per content
+hash (see `report_blobs.py`); collect_report_blobs(grace_seconds) removes
+the unreferenced ones.
+
+Cluster lease bookkeeping used by `cluster_leases.py`:
+- touch_cluster(cluster)
+- add_cluster_lease(cluster, last_seen)
+- list_cluster_leases()
+- list_data_clusters()
+- delete_cluster_lease(cluster)
+- count_cluster_documents(cluster)
+- purge_cluster_batch(cluster, batch_size)
+
+Version history used by `history.py`:
+- put_history_entry(entry)
+- find_history_version(uid, before_version, before_ts, kinds)
+- load_history(uid, start_version, end_version)
+- delete_history_before(uid, version)
+- history_compaction_candidates(cutoff, max_versions)
 
 The implementation uses MONGO_URI and MONGO_DB environment variables.
 """
 
+import io
+import json
 import os
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
 from typing import Any
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
 from pymongo.errors import PyMongoError
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+
+from report_blobs import BLOBS_FIELD, BlobCache, RecentBlobs, assemble_report, grace_seconds, split_report
 
 
 # Shared error messages
 DB_NOT_CONNECTED = "Database not connected"
 
+# Mongo collections used for bookkeeping rather than resource documents
+CLUSTER_LEASES = "cluster_leases"
+REPORT_BLOBS = "report_blobs"
+RESOURCE_HISTORY = "resource_history"
+INTERNAL_COLLECTIONS = {CLUSTER_LEASES, REPORT_BLOBS, RESOURCE_HISTORY}
+
+# Rows sent per bulk_write call / COPY chunk
+BULK_CHUNK_SIZE = 5000
+# Smaller Postgres bulk upserts use a multi-row INSERT instead of COPY
+COPY_MIN_ROWS = 1000
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _dedup_reports_enabled() -> bool:
+    return os.getenv("DEDUP_REPORTS", "false").lower() in ("1", "true", "yes")
+
+
+def _split_rows(rows: Iterable[tuple[str, str, dict[str, Any]]], store_blobs, min_bytes: int) -> Iterator[tuple]:
+    """Split report sections out of bulk rows.
+
+    The blobs of each chunk are stored before its rows are yielded, so a
+    document never references a blob that does not exist yet.
+    """
+    for chunk in _chunked(rows, BULK_CHUNK_SIZE):
+        blobs: dict[str, Any] = {}
+        split = []
+        for resource_type, uid, doc in chunk:
+            doc, doc_blobs = split_report(doc, min_bytes)
+            blobs.update(doc_blobs)
+            split.append((resource_type, uid, doc))
+        if blobs:
+            store_blobs(blobs)
+        yield from split
+
+
+def _copy_text(value: Any) -> str:
+    """Render a value as a field of COPY's text format."""
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
 
 class MongoDatabaseClient:
-    def __init__(self, uri: str | None = None, db_name: str | None = None):
+    def __init__(self, uri: str | None = None, db_name: str | None = None, dedup_reports: bool | None = None):
         self.uri = uri or os.getenv("MONGO_URI")
         self.db_name = db_name or os.getenv("MONGO_DB", "shield")
         self.client: MongoClient | None = None
         self.db = None
 
+        self.dedup_reports = dedup_reports if dedup_reports is not None else _dedup_reports_enabled()
+        self.dedup_min_bytes = int(os.getenv("DEDUP_MIN_BYTES", "4096"))
+        self._recent_blobs = RecentBlobs(grace_seconds() / 2)
+        self._cached_blob = BlobCache(self._load_blob)
+        self._history_indexed = False
+        self._cluster_indexed: set[str] = set()
+        self._blobs_indexed: set[str] = set()
+
     def connect(self) -> None:
         if self.client is not None:
             return
@@ -58,6 +142,10 @@ class MongoDatabaseClient:
         if self.db is None:
             raise RuntimeError(DB_NOT_CONNECTED)
         try:
+            if self.dedup_reports:
+                doc, blobs = split_report(doc, self.dedup_min_bytes)
+                if blobs:
+                    self._store_blobs(blobs)
             coll = self.db[resource_type]
             # Use uid as the document _id so deletes/upserts are straightforward
             doc_to_save = dict(doc)
@@ -84,6 +172,265 @@ class MongoDatabaseClient:
     def delete_namespace(self, uid: str) -> bool:
         return self.delete_resource("namespace", uid)
 
+    def bulk_upsert_resources(self, rows: Iterable[tuple[str, str, dict[str, Any]]]) -> bool:
+        """Upsert many (resource_type, uid, doc) rows with unordered bulk writes."""
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        if self.dedup_reports:
+            rows = _split_rows(rows, self._store_blobs, self.dedup_min_bytes)
+        try:
+            for chunk in _chunked(rows, BULK_CHUNK_SIZE):
+                ops_by_collection: dict[str, list[ReplaceOne]] = {}
+                for resource_type, uid, doc in chunk:
+                    doc_to_save = dict(doc)
+                    doc_to_save["_id"] = uid
+                    ops_by_collection.setdefault(resource_type, []).append(
+                        ReplaceOne({"_id": uid}, doc_to_save, upsert=True)
+                    )
+                for resource_type, ops in ops_by_collection.items():
+                    self.db[resource_type].bulk_write(ops, ordered=False)
+            return True
+        except PyMongoError:
+            return False
+
+    def bulk_upsert_namespaces(self, rows: Iterable[tuple[str, dict[str, Any]]]) -> bool:
+        return self.bulk_upsert_resources(("namespace", uid, doc) for uid, doc in rows)
+
+    def _store_blobs(self, blobs: dict[str, Any]) -> None:
+        keys = self._recent_blobs.unwritten(blobs)
+        if not keys:
+            return
+        now = datetime.now(timezone.utc)
+        self.db[REPORT_BLOBS].bulk_write(
+            [
+                # The body never changes for a key, so only refresh last_seen on existing blobs
+                UpdateOne({"_id": key}, {"$setOnInsert": {"body": blobs[key]}, "$set": {"last_seen": now}}, upsert=True)
+                for key in keys
+            ],
+            ordered=False,
+        )
+        self._recent_blobs.mark_written(keys)
+
+    def _load_blob(self, key: str) -> Any:
+        blob = self.db[REPORT_BLOBS].find_one({"_id": key}, {"body": 1})
+        return blob["body"] if blob else None
+
+    def get_resource(self, resource_type: str, uid: str) -> dict[str, Any] | None:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        doc = self.db[resource_type].find_one({"_id": uid})
+        if doc is None:
+            return None
+        doc.pop("_id")
+        return assemble_report(doc, self._cached_blob)
+
+    def collect_report_blobs(self, grace_seconds: float) -> int:
+        """Delete blobs that no document references and that were not written within the grace period."""
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        referenced = set()
+        for name in self._data_collections():
+            pipeline = [
+                {"$match": {BLOBS_FIELD: {"$exists": True}}},
+                {"$unwind": f"${BLOBS_FIELD}"},
+                {"$group": {"_id": f"${BLOBS_FIELD}"}},
+            ]
+            referenced.update(row["_id"] for row in self._blobs_collection(name).aggregate(pipeline))
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+        candidates = self.db[REPORT_BLOBS].find({"last_seen": {"$lt": cutoff}}, {"_id": 1})
+        orphans = [blob["_id"] for blob in candidates if blob["_id"] not in referenced]
+        deleted = 0
+        for chunk in _chunked(orphans, BULK_CHUNK_SIZE):
+            # Re-check the age: a writer may have refreshed the blob since the scan
+            deleted += self.db[REPORT_BLOBS].delete_many(
+                {"_id": {"$in": chunk}, "last_seen": {"$lt": cutoff}}
+            ).deleted_count
+        return deleted
+
+    def _data_collections(self) -> list[str]:
+        return [name for name in self.db.list_collection_names() if name not in INTERNAL_COLLECTIONS]
+
+    def list_resource_types(self) -> list[str]:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        return sorted(name for name in self._data_collections() if name != "namespace")
+
+    def iter_resources(self, resource_type: str, batch_size: int = 1000) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield (uid, doc) for every document of `resource_type`, fetching `batch_size` at a time."""
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        for doc in self.db[resource_type].find({}, batch_size=batch_size):
+            uid = doc.pop("_id")
+            yield uid, assemble_report(doc, self._cached_blob)
+
+    def iter_namespaces(self, batch_size: int = 1000) -> Iterator[tuple[str, dict[str, Any]]]:
+        return self.iter_resources("namespace", batch_size)
+
+    def touch_cluster(self, cluster: str) -> bool:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            self.db[CLUSTER_LEASES].update_one(
+                {"_id": cluster},
+                {"$set": {"last_seen": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+            return True
+        except PyMongoError:
+            return False
+
+    def add_cluster_lease(self, cluster: str, last_seen: datetime) -> bool:
+        """Create a lease for `cluster` unless it already has one."""
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            result = self.db[CLUSTER_LEASES].update_one(
+                {"_id": cluster}, {"$setOnInsert": {"last_seen": last_seen}}, upsert=True
+            )
+            return result.upserted_id is not None
+        except PyMongoError:
+            return False
+
+    def list_cluster_leases(self) -> dict[str, datetime]:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        leases = {}
+        for lease in self.db[CLUSTER_LEASES].find():
+            # PyMongo returns naive datetimes that are already in UTC
+            leases[lease["_id"]] = lease["last_seen"].replace(tzinfo=timezone.utc)
+        return leases
+
+    def delete_cluster_lease(self, cluster: str) -> bool:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            return self.db[CLUSTER_LEASES].delete_one({"_id": cluster}).deleted_count > 0
+        except PyMongoError:
+            return False
+
+    def _cluster_collection(self, name: str):
+        # Lets the cluster sweeper find a cluster's documents without a collection scan
+        coll = self.db[name]
+        if name not in self._cluster_indexed:
+            coll.create_index([("_cluster", 1)])
+            self._cluster_indexed.add(name)
+        return coll
+
+    def _blobs_collection(self, name: str):
+        # Lets blob collection match documents that reference blobs without a collection scan
+        coll = self.db[name]
+        if self.dedup_reports and name not in self._blobs_indexed:
+            coll.create_index([(BLOBS_FIELD, 1)], sparse=True)
+            self._blobs_indexed.add(name)
+        return coll
+
+    def list_data_clusters(self) -> set[str]:
+        """Return every cluster that has documents stored."""
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        clusters: set[str] = set()
+        for name in self._data_collections():
+            clusters.update(c for c in self._cluster_collection(name).distinct("_cluster") if c)
+        return clusters
+
+    def count_cluster_documents(self, cluster: str) -> int:
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        return sum(
+            self._cluster_collection(name).count_documents({"_cluster": cluster}) for name in self._data_collections()
+        )
+
+    def purge_cluster_batch(self, cluster: str, batch_size: int) -> int:
+        """Delete up to `batch_size` documents belonging to `cluster`.
+
+        Returns the number of documents deleted; 0 means nothing is left.
+        """
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        deleted = 0
+        for name in self._data_collections():
+            remaining = batch_size - deleted
+            if remaining <= 0:
+                break
+            coll = self._cluster_collection(name)
+            ids = [d["_id"] for d in coll.find({"_cluster": cluster}, {"_id": 1}).limit(remaining)]
+            if ids:
+                deleted += coll.delete_many({"_id": {"$in": ids}}).deleted_count
+        return deleted
+
+    def _history(self):
+        if self.db is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        coll = self.db[RESOURCE_HISTORY]
+        if not self._history_indexed:
+            coll.create_index([("uid", 1), ("version", 1)], unique=True)
+            coll.create_index([("ts", 1)])
+            self._history_indexed = True
+        return coll
+
+    @staticmethod
+    def _history_entry(doc: dict[str, Any]) -> dict[str, Any]:
+        doc.pop("_id", None)
+        # PyMongo returns naive datetimes that are already in UTC
+        doc["ts"] = doc["ts"].replace(tzinfo=timezone.utc)
+        return doc
+
+    def put_history_entry(self, entry: dict[str, Any]) -> bool:
+        """Store a history entry, replacing an existing entry of the same uid and version."""
+        try:
+            self._history().replace_one(
+                {"_id": f"{entry['uid']}:{entry['version']}"},
+                {"_id": f"{entry['uid']}:{entry['version']}", **entry},
+                upsert=True,
+            )
+            return True
+        except PyMongoError:
+            return False
+
+    def find_history_version(
+        self,
+        uid: str,
+        before_version: int | None = None,
+        before_ts: datetime | None = None,
+        kinds: Iterable[str] | None = None,
+    ) -> int | None:
+        """Return the highest version of `uid` at or before the given version/time and of the given kinds."""
+        query: dict[str, Any] = {"uid": uid}
+        if before_version is not None:
+            query["version"] = {"$lte": before_version}
+        if before_ts is not None:
+            query["ts"] = {"$lte": before_ts}
+        if kinds is not None:
+            query["kind"] = {"$in": list(kinds)}
+        doc = self._history().find_one(query, {"version": 1}, sort=[("version", -1)])
+        return doc["version"] if doc else None
+
+    def load_history(self, uid: str, start_version: int, end_version: int | None = None) -> list[dict[str, Any]]:
+        """Return the entries of `uid` from `start_version` to `end_version` (inclusive), oldest first."""
+        versions: dict[str, Any] = {"$gte": start_version}
+        if end_version is not None:
+            versions["$lte"] = end_version
+        cursor = self._history().find({"uid": uid, "version": versions}).sort("version", 1)
+        return [self._history_entry(doc) for doc in cursor]
+
+    def delete_history_before(self, uid: str, version: int) -> int:
+        return self._history().delete_many({"uid": uid, "version": {"$lt": version}}).deleted_count
+
+    def history_compaction_candidates(self, cutoff: datetime, max_versions: int) -> list[tuple[str, int]]:
+        """Return (uid, latest version) for every uid with entries older than `cutoff` or too many entries."""
+        pipeline = [
+            {
+                "$group": {
+                    "_id": "$uid",
+                    "latest": {"$max": "$version"},
+                    "count": {"$sum": 1},
+                    "oldest": {"$min": "$ts"},
+                }
+            },
+            {"$match": {"$or": [{"oldest": {"$lt": cutoff}}, {"count": {"$gt": max_versions}}]}},
+        ]
+        return [(doc["_id"], doc["latest"]) for doc in self._history().aggregate(pipeline, allowDiskUse=True)]
+
 
 class DatabaseFactory:
     @staticmethod
@@ -112,6 +459,7 @@ class PostgresDatabaseClient:
         db_name: str | None = None,
         user: str | None = None,
         password: str | None = None,
+        dedup_reports: bool | None = None,
     ):
         self.host = host or os.getenv("POSTGRES_HOST", "localhost")
         self.port = port or int(os.getenv("POSTGRES_PORT", "5432"))
@@ -121,18 +469,19 @@ class PostgresDatabaseClient:
 
         self.conn: psycopg2.extensions.connection | None = None
 
+        self.dedup_reports = dedup_reports if dedup_reports is not None else _dedup_reports_enabled()
+        self.dedup_min_bytes = int(os.getenv("DEDUP_MIN_BYTES", "4096"))
+        self._recent_blobs = RecentBlobs(grace_seconds() / 2)
+        self._cached_blob = BlobCache(self._load_blob)
+
     def connect(self) -> None:
         if self.conn is not None:
             return
         if not self.db_name:
             raise RuntimeError("POSTGRES_DB is not set")
 
-        # Short connect timeout so failures surface quickly
-        conn_str = (
-            f"host={self.host} port={self.port} dbname={self.db_name} user={self.user} password={self.password}"
-        )
         try:
-            self.conn = psycopg2.connect(conn_str, connect_timeout=5)
+            self.conn = self._open_connection()
             self.conn.autocommit = True
             # Ensure tables exist
             with self.conn.cursor() as cur:
@@ -153,10 +502,59 @@ class PostgresDatabaseClient:
                     )
                     """
                 )
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS cluster_leases (
+                        cluster TEXT PRIMARY KEY,
+                        last_seen TIMESTAMPTZ NOT NULL
+                    )
+                    """
+                )
+                # Lets the cluster sweeper find a cluster's rows without a full scan
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS resources_cluster_idx ON resources ((data->>'_cluster'))"
+                )
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS namespaces_cluster_idx ON namespaces ((data->>'_cluster'))"
+                )
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS report_blobs (
+                        key TEXT PRIMARY KEY,
+                        body JSONB NOT NULL,
+                        last_seen TIMESTAMPTZ NOT NULL
+                    )
+                    """
+                )
+                if self.dedup_reports:
+                    # Lets blob collection check references without scanning every document
+                    cur.execute(
+                        "CREATE INDEX IF NOT EXISTS resources_blobs_idx ON resources USING GIN ((data->'_blobs'))"
+                    )
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS resource_history (
+                        uid TEXT NOT NULL,
+                        version INTEGER NOT NULL,
+                        resource_type TEXT NOT NULL,
+                        ts TIMESTAMPTZ NOT NULL,
+                        kind TEXT NOT NULL,
+                        body JSONB,
+                        PRIMARY KEY (uid, version)
+                    )
+                    """
+                )
         except Exception as e:
             # Normalize exceptions to RuntimeError so callers behave similarly
             raise RuntimeError(f"Failed to connect to Postgres: {e}") from e
 
+    def _open_connection(self) -> "psycopg2.extensions.connection":
+        # Short connect timeout so failures surface quickly
+        conn_str = (
+            f"host={self.host} port={self.port} dbname={self.db_name} user={self.user} password={self.password}"
+        )
+        return psycopg2.connect(conn_str, connect_timeout=5)
+
     def disconnect(self) -> None:
         if self.conn is not None:
             try:
@@ -168,6 +566,10 @@ class PostgresDatabaseClient:
         if self.conn is None:
             raise RuntimeError(DB_NOT_CONNECTED)
         try:
+            if self.dedup_reports:
+                doc, blobs = split_report(doc, self.dedup_min_bytes)
+                if blobs:
+                    self._store_blobs(blobs)
             with self.conn.cursor() as cur:
                 cur.execute(
                     """
@@ -223,3 +625,358 @@ class PostgresDatabaseClient:
                 return cur.rowcount > 0
         except Exception:
             return False
+
+    def _bulk_merge(self, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> bool:
+        """Upsert rows into `table`, the last row per uid winning.
+
+        Batches of fewer than COPY_MIN_ROWS rows, such as those of the write
+        pipelines, are sent as one multi-row INSERT on the shared connection,
+        which is cheaper than setting up a COPY load.
+        """
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        rows = iter(rows)
+        try:
+            head = list(islice(rows, COPY_MIN_ROWS))
+        except Exception:
+            return False
+        if len(head) < COPY_MIN_ROWS:
+            return self._values_merge(table, columns, head)
+        return self._copy_merge(table, columns, chain(head, rows))
+
+    def _values_merge(self, table: str, columns: tuple[str, ...], rows: list[tuple]) -> bool:
+        # ON CONFLICT cannot update the same row twice in one statement
+        latest = {row[0]: row for row in rows}
+        if not latest:
+            return True
+        column_list = ", ".join(columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "uid")
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    f"INSERT INTO {table} ({column_list}) VALUES %s ON CONFLICT (uid) DO UPDATE SET {updates}",
+                    [tuple(Json(v) if isinstance(v, dict) else v for v in row) for row in latest.values()],
+                    # One statement, so the batch is applied atomically
+                    page_size=len(latest),
+                )
+            return True
+        except Exception:
+            return False
+
+    def _copy_merge(self, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> bool:
+        """Stream rows into a staging table with COPY and merge them into `table`.
+
+        The load runs on its own connection and transaction so it neither
+        blocks nor is interleaved with the autocommit statements issued on the
+        shared connection. The staging table is a temporary table, which like
+        an unlogged table skips the WAL, and is private to the load so
+        concurrent bulk loads cannot collide. When a uid appears more than
+        once the last row wins.
+        """
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        column_list = ", ".join(columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "uid")
+        try:
+            conn = self._open_connection()
+        except Exception:
+            return False
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE staging (LIKE {table}, seq BIGSERIAL) ON COMMIT DROP")
+                for chunk in _chunked(rows, BULK_CHUNK_SIZE):
+                    buf = io.StringIO()
+                    buf.writelines("\t".join(map(_copy_text, row)) + "\n" for row in chunk)
+                    buf.seek(0)
+                    cur.copy_expert(f"COPY staging ({column_list}) FROM STDIN", buf)
+                cur.execute(
+                    f"""
+                    INSERT INTO {table} ({column_list})
+                    SELECT DISTINCT ON (uid) {column_list} FROM staging ORDER BY uid, seq DESC
+                    ON CONFLICT (uid) DO UPDATE SET {updates}
+                    """
+                )
+            return True
+        except Exception:
+            return False
+        finally:
+            conn.close()
+
+    def bulk_upsert_resources(self, rows: Iterable[tuple[str, str, dict[str, Any]]]) -> bool:
+        """Upsert many (resource_type, uid, doc) rows with one COPY and one merge."""
+        if self.dedup_reports:
+            rows = _split_rows(rows, self._store_blobs, self.dedup_min_bytes)
+        return self._bulk_merge(
+            "resources",
+            ("uid", "resource_type", "data"),
+            ((uid, resource_type, doc) for resource_type, uid, doc in rows),
+        )
+
+    def bulk_upsert_namespaces(self, rows: Iterable[tuple[str, dict[str, Any]]]) -> bool:
+        return self._bulk_merge("namespaces", ("uid", "data"), rows)
+
+    def _store_blobs(self, blobs: dict[str, Any]) -> None:
+        keys = self._recent_blobs.unwritten(blobs)
+        if not keys:
+            return
+        with self.conn.cursor() as cur:
+            # The body never changes for a key, so only refresh last_seen on existing blobs
+            execute_values(
+                cur,
+                """
+                INSERT INTO report_blobs (key, body, last_seen) VALUES %s
+                ON CONFLICT (key) DO UPDATE SET last_seen = EXCLUDED.last_seen
+                """,
+                [(key, Json(blobs[key])) for key in keys],
+                template="(%s, %s, now())",
+            )
+        self._recent_blobs.mark_written(keys)
+
+    def _load_blob(self, key: str) -> Any:
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT body FROM report_blobs WHERE key = %s", (key,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    def get_resource(self, resource_type: str, uid: str) -> dict[str, Any] | None:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT data FROM resources WHERE uid = %s AND resource_type = %s", (uid, resource_type))
+            row = cur.fetchone()
+        return assemble_report(row[0], self._cached_blob) if row else None
+
+    def collect_report_blobs(self, grace_seconds: float) -> int:
+        """Delete blobs that no row references and that were not written within the grace period."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM report_blobs b
+                WHERE b.last_seen < now() - make_interval(secs => %s)
+                  AND NOT EXISTS (SELECT 1 FROM resources r WHERE r.data->'_blobs' ? b.key)
+                """,
+                (grace_seconds,),
+            )
+            return cur.rowcount
+
+    def list_resource_types(self) -> list[str]:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT resource_type FROM resources ORDER BY resource_type")
+            return [row[0] for row in cur.fetchall()]
+
+    def _iter_rows(self, query: str, params: tuple, batch_size: int) -> Iterator[tuple]:
+        # Server-side cursors need a transaction, so they get their own connection
+        conn = self._open_connection()
+        try:
+            with conn.cursor(name="shield_export") as cur:
+                cur.itersize = batch_size
+                cur.execute(query, params)
+                yield from cur
+        finally:
+            conn.close()
+
+    def iter_resources(self, resource_type: str, batch_size: int = 1000) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield (uid, doc) for every row of `resource_type`, fetching `batch_size` at a time."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        rows = self._iter_rows("SELECT uid, data FROM resources WHERE resource_type = %s", (resource_type,), batch_size)
+        for uid, doc in rows:
+            yield uid, assemble_report(doc, self._cached_blob)
+
+    def iter_namespaces(self, batch_size: int = 1000) -> Iterator[tuple[str, dict[str, Any]]]:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        yield from self._iter_rows("SELECT uid, data FROM namespaces", (), batch_size)
+
+    def touch_cluster(self, cluster: str) -> bool:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO cluster_leases (cluster, last_seen)
+                    VALUES (%s, now())
+                    ON CONFLICT (cluster) DO UPDATE SET last_seen = EXCLUDED.last_seen
+                    """,
+                    (cluster,),
+                )
+            return True
+        except Exception:
+            return False
+
+    def add_cluster_lease(self, cluster: str, last_seen: datetime) -> bool:
+        """Create a lease for `cluster` unless it already has one."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO cluster_leases (cluster, last_seen) VALUES (%s, %s) ON CONFLICT (cluster) DO NOTHING",
+                    (cluster, last_seen),
+                )
+                return cur.rowcount > 0
+        except Exception:
+            return False
+
+    def list_cluster_leases(self) -> dict[str, datetime]:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT cluster, last_seen FROM cluster_leases")
+            return dict(cur.fetchall())
+
+    def delete_cluster_lease(self, cluster: str) -> bool:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("DELETE FROM cluster_leases WHERE cluster = %s", (cluster,))
+                return cur.rowcount > 0
+        except Exception:
+            return False
+
+    def list_data_clusters(self) -> set[str]:
+        """Return every cluster that has rows stored."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT data->>'_cluster' FROM resources
+                UNION
+                SELECT data->>'_cluster' FROM namespaces
+                """
+            )
+            return {row[0] for row in cur.fetchall() if row[0]}
+
+    def count_cluster_documents(self, cluster: str) -> int:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT (SELECT count(*) FROM resources WHERE data->>'_cluster' = %s)
+                     + (SELECT count(*) FROM namespaces WHERE data->>'_cluster' = %s)
+                """,
+                (cluster, cluster),
+            )
+            return cur.fetchone()[0]
+
+    def purge_cluster_batch(self, cluster: str, batch_size: int) -> int:
+        """Delete up to `batch_size` rows belonging to `cluster`.
+
+        Returns the number of rows deleted; 0 means nothing is left.
+        """
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        deleted = 0
+        with self.conn.cursor() as cur:
+            for table in ("resources", "namespaces"):
+                remaining = batch_size - deleted
+                if remaining <= 0:
+                    break
+                cur.execute(
+                    f"""
+                    DELETE FROM {table} WHERE uid IN (
+                        SELECT uid FROM {table} WHERE data->>'_cluster' = %s LIMIT %s
+                    )
+                    """,
+                    (cluster, remaining),
+                )
+                deleted += cur.rowcount
+        return deleted
+
+    def put_history_entry(self, entry: dict[str, Any]) -> bool:
+        """Store a history entry, replacing an existing entry of the same uid and version."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO resource_history (uid, version, resource_type, ts, kind, body)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (uid, version) DO UPDATE
+                    SET resource_type = EXCLUDED.resource_type, ts = EXCLUDED.ts,
+                        kind = EXCLUDED.kind, body = EXCLUDED.body
+                    """,
+                    (
+                        entry["uid"],
+                        entry["version"],
+                        entry["resource_type"],
+                        entry["ts"],
+                        entry["kind"],
+                        Json(entry["body"]) if entry["body"] is not None else None,
+                    ),
+                )
+            return True
+        except Exception:
+            return False
+
+    def find_history_version(
+        self,
+        uid: str,
+        before_version: int | None = None,
+        before_ts: datetime | None = None,
+        kinds: Iterable[str] | None = None,
+    ) -> int | None:
+        """Return the highest version of `uid` at or before the given version/time and of the given kinds."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        conditions, params = ["uid = %s"], [uid]
+        if before_version is not None:
+            conditions.append("version <= %s")
+            params.append(before_version)
+        if before_ts is not None:
+            conditions.append("ts <= %s")
+            params.append(before_ts)
+        if kinds is not None:
+            conditions.append("kind = ANY(%s)")
+            params.append(list(kinds))
+        with self.conn.cursor() as cur:
+            cur.execute(f"SELECT max(version) FROM resource_history WHERE {' AND '.join(conditions)}", params)
+            return cur.fetchone()[0]
+
+    def load_history(self, uid: str, start_version: int, end_version: int | None = None) -> list[dict[str, Any]]:
+        """Return the entries of `uid` from `start_version` to `end_version` (inclusive), oldest first."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT uid, version, resource_type, ts, kind, body FROM resource_history
+                WHERE uid = %s AND version >= %s AND (%s::integer IS NULL OR version <= %s)
+                ORDER BY version
+                """,
+                (uid, start_version, end_version, end_version),
+            )
+            columns = ("uid", "version", "resource_type", "ts", "kind", "body")
+            return [dict(zip(columns, row, strict=True)) for row in cur.fetchall()]
+
+    def delete_history_before(self, uid: str, version: int) -> int:
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute("DELETE FROM resource_history WHERE uid = %s AND version < %s", (uid, version))
+            return cur.rowcount
+
+    def history_compaction_candidates(self, cutoff: datetime, max_versions: int) -> list[tuple[str, int]]:
+        """Return (uid, latest version) for every uid with entries older than `cutoff` or too many entries."""
+        if self.conn is None:
+            raise RuntimeError(DB_NOT_CONNECTED)
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT uid, max(version) FROM resource_history
+                GROUP BY uid
+                HAVING min(ts) < %s OR count(*) > %s
+                """,
+                (cutoff, max_versions),
+            )
+            return cur.fetchall()
@@ -16,9 +16,15 @@ from concurrent import futures
 import grpc
 from dotenv import load_dotenv
 
+import profiling
 import sync_service_pb2
 import sync_service_pb2_grpc
+import tracing
+from cluster_leases import ClusterLeaseTracker, ClusterSweeper
 from database import DatabaseFactory
+from history import HistoryCompactor, HistoryRecorder, history_enabled
+from pipelines import WritePipelines
+from report_blobs import ReportBlobCollector
 
 # Load environment variables from .env file
 load_dotenv()
@@ -40,6 +46,50 @@ logger = logging.getLogger("grpc-receiver")
 # Connecting is performed when the server is started so tests can import
 # this module without triggering network calls.
 db_client = DatabaseFactory.create_client()
+lease_tracker = ClusterLeaseTracker(db_client)
+
+# Per-resource-type write pipelines, started by serve()
+write_pipelines: WritePipelines | None = None
+
+# Records resource versions when HISTORY_ENABLED is set, started by serve()
+history_recorder: HistoryRecorder | None = None
+
+# Number of InitialSync items buffered before they are written in bulk
+INITIAL_SYNC_BATCH_SIZE = int(os.environ.get("INITIAL_SYNC_BATCH_SIZE", "10000"))
+
+
+def writer():
+    """Return the target of single-document writes: the write pipelines once started, else the client"""
+    return write_pipelines if write_pipelines is not None else db_client
+
+
+def record_history(resource_type, uid, doc):
+    """Queue a resource version for the history; doc is None for deletions"""
+    if history_recorder is not None:
+        history_recorder.record(resource_type, uid, doc)
+
+
+def build_resource_doc(request, data):
+    """Create the document structure (same as original controller)"""
+    return {
+        "_event_type": request.event_type,
+        "_resource_type": request.resource_type,
+        "_namespace": request.namespace,
+        "_name": request.name,
+        "_cluster": request.cluster,
+        "data": data,
+    }
+
+
+def build_namespace_doc(request, data):
+    """Create the document structure (same as original controller)"""
+    return {
+        "_event_type": request.event_type,
+        "_resource_type": "namespace",
+        "_name": request.name,
+        "_cluster": request.cluster,
+        "data": data,
+    }
 
 
 class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
@@ -48,15 +98,28 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
 
     def SyncResource(self, request, context):
         """Handle resource sync requests"""
+        attributes = {
+            "shield.event_type": request.event_type,
+            "shield.resource_type": request.resource_type,
+            "shield.cluster": request.cluster,
+        }
+        with tracing.server_span("SyncResource", context, attributes):
+            return self._sync_resource(request)
+
+    def _sync_resource(self, request):
         try:
             if db_client is None:
                 raise RuntimeError("Database client is not initialized")
+            lease_tracker.observe(request.cluster)
             # Parse the JSON data
-            data = json.loads(request.data_json)
+            with tracing.span("json.decode", {"shield.payload_bytes": len(request.data_json)}):
+                data = json.loads(request.data_json)
 
             if request.event_type == "DELETED":
-                success = db_client.delete_resource(request.resource_type, request.uid)
+                with tracing.span("db.delete_resource", {"db.collection.name": request.resource_type}):
+                    success = writer().delete_resource(request.resource_type, request.uid)
                 if success:
+                    record_history(request.resource_type, request.uid, None)
                     logger.info(f"Deleted {request.resource_type} {request.name} ({request.event_type})")
                     return sync_service_pb2.SyncResourceResponse(
                         success=True,
@@ -68,15 +131,8 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
                         message=f"Failed to delete {request.resource_type} {request.name}"
                     )
 
-            # Create the document structure (same as original controller)
-            doc = {
-                "_event_type": request.event_type,
-                "_resource_type": request.resource_type,
-                "_namespace": request.namespace,
-                "_name": request.name,
-                "_cluster": request.cluster,
-                "data": data,
-            }
+            with tracing.span("document.build"):
+                doc = build_resource_doc(request, data)
 
             # Store in database
             uid = request.uid
@@ -88,9 +144,11 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
                 )
 
             # Upsert the document
-            success = db_client.upsert_resource(request.resource_type, uid, doc)
+            with tracing.span("db.upsert_resource", {"db.collection.name": request.resource_type}):
+                success = writer().upsert_resource(request.resource_type, uid, doc)
 
             if success:
+                record_history(request.resource_type, uid, doc)
                 logger.info(f"Synced {request.resource_type} {request.name} ({request.event_type})")
                 return sync_service_pb2.SyncResourceResponse(
                     success=True,
@@ -111,14 +169,25 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
 
     def SyncNamespace(self, request, context):
         """Handle namespace sync requests"""
+        attributes = {
+            "shield.event_type": request.event_type,
+            "shield.cluster": request.cluster,
+        }
+        with tracing.server_span("SyncNamespace", context, attributes):
+            return self._sync_namespace(request)
+
+    def _sync_namespace(self, request):
         try:
             if db_client is None:
                 raise RuntimeError("Database client is not initialized")
+            lease_tracker.observe(request.cluster)
             # Parse the JSON data
-            data = json.loads(request.data_json)
+            with tracing.span("json.decode", {"shield.payload_bytes": len(request.data_json)}):
+                data = json.loads(request.data_json)
 
             if request.event_type == "DELETED":
-                success = db_client.delete_namespace(request.uid)
+                with tracing.span("db.delete_namespace"):
+                    success = writer().delete_namespace(request.uid)
                 if success:
                     logger.info(f"Deleted namespace {request.name} ({request.event_type})")
                     return sync_service_pb2.SyncNamespaceResponse(
@@ -131,14 +200,8 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
                         message=f"Failed to delete namespace {request.name}"
                     )
 
-            # Create the document structure (same as original controller)
-            doc = {
-                "_event_type": request.event_type,
-                "_resource_type": "namespace",
-                "_name": request.name,
-                "_cluster": request.cluster,
-                "data": data,
-            }
+            with tracing.span("document.build"):
+                doc = build_namespace_doc(request, data)
 
             # Store in database
             uid = request.uid
@@ -150,7 +213,8 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
                 )
 
             # Upsert the document
-            success = db_client.upsert_namespace(uid, doc)
+            with tracing.span("db.upsert_namespace"):
+                success = writer().upsert_namespace(uid, doc)
 
             if success:
                 logger.info(f"Synced namespace {request.name} ({request.event_type})")
@@ -171,11 +235,98 @@ class SyncServiceServicer(sync_service_pb2_grpc.SyncServiceServicer):
                 message=f"Error: {str(e)}"
             )
 
+    def Heartbeat(self, request, context):
+        """Handle cluster heartbeats"""
+        if not request.cluster:
+            return sync_service_pb2.HeartbeatResponse(success=False, message="No cluster provided")
+        if lease_tracker.heartbeat(request.cluster):
+            return sync_service_pb2.HeartbeatResponse(
+                success=True,
+                message=f"Renewed lease for cluster {request.cluster}"
+            )
+        return sync_service_pb2.HeartbeatResponse(
+            success=False,
+            message=f"Failed to renew lease for cluster {request.cluster}"
+        )
+
+    def InitialSync(self, request_iterator, context):
+        """Handle a streamed initial sync of a controller's full inventory"""
+        with tracing.server_span("InitialSync", context):
+            return self._initial_sync(request_iterator)
+
+    def _initial_sync(self, request_iterator):
+        resources = []
+        namespaces = []
+        stored = {"resources": 0, "namespaces": 0}
+
+        def flush():
+            if resources:
+                with tracing.span("db.bulk_upsert_resources", {"shield.rows": len(resources)}):
+                    if not db_client.bulk_upsert_resources(resources):
+                        raise RuntimeError("Bulk resource upsert failed")
+                # Waits for the history recorder instead of dropping most of a large sync
+                if history_recorder is not None:
+                    history_recorder.record_many(resources)
+                stored["resources"] += len(resources)
+                resources.clear()
+            if namespaces:
+                with tracing.span("db.bulk_upsert_namespaces", {"shield.rows": len(namespaces)}):
+                    if not db_client.bulk_upsert_namespaces(namespaces):
+                        raise RuntimeError("Bulk namespace upsert failed")
+                stored["namespaces"] += len(namespaces)
+                namespaces.clear()
+
+        try:
+            if db_client is None:
+                raise RuntimeError("Database client is not initialized")
+            skipped = 0
+            for item in request_iterator:
+                request = item.resource if item.HasField("resource") else item.namespace
+                lease_tracker.observe(request.cluster)
+                # Deletions make no sense in an inventory and are not applied
+                if not request.uid or request.event_type == "DELETED":
+                    skipped += 1
+                    continue
+                data = json.loads(request.data_json)
+                if item.HasField("resource"):
+                    resources.append((request.resource_type, request.uid, build_resource_doc(request, data)))
+                else:
+                    namespaces.append((request.uid, build_namespace_doc(request, data)))
+                if len(resources) + len(namespaces) >= INITIAL_SYNC_BATCH_SIZE:
+                    flush()
+            flush()
+
+            if skipped:
+                logger.warning(f"Skipped {skipped} initial sync items without UID or with DELETED events")
+            logger.info(f"Initial sync stored {stored['resources']} resources and {stored['namespaces']} namespaces")
+            return sync_service_pb2.InitialSyncResponse(
+                success=True,
+                message="Initial sync completed",
+                resources=stored["resources"],
+                namespaces=stored["namespaces"],
+            )
+
+        except Exception as e:
+            logger.error(f"Error during initial sync: {e}")
+            return sync_service_pb2.InitialSyncResponse(
+                success=False,
+                message=f"Error: {str(e)}",
+                resources=stored["resources"],
+                namespaces=stored["namespaces"],
+            )
+
 
 def serve():
     """Start the gRPC server"""
+    global write_pipelines, history_recorder
     port = os.environ.get("GRPC_PORT", "50051")
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+
+    # gRPC threads wait on the write pipelines, so there must be enough of
+    # them for every pipeline to fill its backlog at the same time.
+    # Each pipeline gets its own client, so on Postgres pipelines do not share one connection
+    pipelines = WritePipelines(db_client, client_factory=DatabaseFactory.create_client)
+    max_workers = int(os.environ.get("GRPC_MAX_WORKERS", "0")) or pipelines.thread_budget + 10
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
 
     # Add the servicer to the server
     sync_service_pb2_grpc.add_SyncServiceServicer_to_server(
@@ -190,6 +341,34 @@ def serve():
         logger.error(f"Failed to initialize database: {e}")
         raise
 
+    pipelines.start()
+    write_pipelines = pipelines
+
+    tracing.init_tracing()
+    profiling.install_signal_handler()
+
+    # Expire data of decommissioned clusters when a lease TTL is configured
+    sweeper = ClusterSweeper(db_client)
+    if sweeper.ttl_seconds is not None:
+        sweeper.start()
+
+    # Remove shared report blobs once no document references them
+    blob_collector = ReportBlobCollector(db_client)
+    if db_client.dedup_reports:
+        blob_collector.start()
+
+    # Keep versions of resource documents when history is enabled. History
+    # reads and writes use their own connection so they do not queue behind ingest.
+    history_client = None
+    history_compactor = None
+    if history_enabled():
+        history_client = DatabaseFactory.create_client()
+        history_client.connect()
+        history_recorder = HistoryRecorder(history_client)
+        history_compactor = HistoryCompactor(history_client)
+        history_recorder.start()
+        history_compactor.start()
+
     # Listen on all interfaces
     server.add_insecure_port(f'[::]:{port}')
 
@@ -203,8 +382,17 @@ def serve():
         server.wait_for_termination()
     except KeyboardInterrupt:
         logger.info("Shutting down gRPC server...")
-        db_client.disconnect()
         server.stop(0)
+        sweeper.stop()
+        blob_collector.stop()
+        pipelines.stop()
+        pipelines.log_stats()
+        if history_client is not None:
+            history_recorder.stop()
+            history_compactor.stop()
+            history_client.disconnect()
+        db_client.disconnect()
+        tracing.shutdown_tracing()
 
 
 if __name__ == "__main__":
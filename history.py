@@ -0,0 +1,446 @@
+"""Version history of resource documents with delta-encoded version chains.
+
+With HISTORY_ENABLED=true every stored resource version is also appended to a
+`resource_history` collection/table, so trends such as the vulnerabilities of
+a workload over time can be reconstructed. For each uid the history is a chain
+of numbered entries:
+
+- "snapshot": the full document
+- "delta": the changes against the previous version (see `diff`)
+- "deleted": the resource was deleted
+
+A snapshot is written for the first version, then at least every
+HISTORY_SNAPSHOT_EVERY versions or HISTORY_SNAPSHOT_INTERVAL_SECONDS, and
+whenever a delta would not be much smaller than the document. Any version is
+therefore rebuilt from one snapshot plus a bounded number of deltas.
+Unchanged versions are not recorded.
+
+`HistoryRecorder` writes the entries from a background thread so the ingest
+path only pays for a queue insert. Single syncs never wait for it: their
+versions are dropped when the queue is full. Bulk writes such as InitialSync
+wait for queue space for up to HISTORY_BULK_TIMEOUT_SECONDS per batch, so a
+large initial sync is slowed down to the recording rate instead of losing
+most of its versions. `HistoryStore` is the query API and
+`HistoryCompactor` enforces HISTORY_RETENTION_SECONDS and
+HISTORY_MAX_VERSIONS, turning the oldest kept entry into a snapshot so the
+remaining chain stays complete.
+
+Run this module to print versions of a uid:
+
+    python history.py <uid> --version 3
+    python history.py <uid> --since 2026-01-01T00:00:00+00:00
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger("grpc-receiver")
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+DELETED = "deleted"
+
+
+def diff(old: Any, new: Any, path: list | None = None) -> list[list]:
+    """Describe how to turn `old` into `new` as a list of operations.
+
+    - ["set", path, value]: set the value at path (an empty path replaces the whole document)
+    - ["del", path]: remove a dict key
+    - ["splice", path, start, end, items]: replace list[start:end] with items
+
+    List changes are narrowed to the range between the common prefix and
+    suffix, so adding or fixing one vulnerability costs one small splice.
+    """
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: list[list] = [["del", path + [key]] for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append(["set", path + [key], value])
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, path + [key]))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        start = 0
+        while start < len(old) and start < len(new) and old[start] == new[start]:
+            start += 1
+        end_old, end_new = len(old), len(new)
+        while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+        if start == end_old == end_new:
+            return []
+        # A single element changed in place is diffed recursively
+        changed_old, changed_new = old[start:end_old], new[start:end_new]
+        if len(changed_old) == len(changed_new) == 1 and isinstance(changed_old[0], dict | list):
+            if type(changed_old[0]) is type(changed_new[0]):
+                return diff(changed_old[0], changed_new[0], path + [start])
+        return [["splice", path, start, end_old, changed_new]]
+
+    return [["set", path, new]] if old != new else []
+
+
+def apply_delta(doc: Any, ops: list[list]) -> Any:
+    """Apply operations produced by `diff` to `doc` in place and return the result."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if kind == "splice":
+            target = doc
+            for key in path:
+                target = target[key]
+            target[op[2] : op[3]] = op[4]
+            continue
+        if not path:
+            doc = op[2]
+            continue
+        parent = doc
+        for key in path[:-1]:
+            parent = parent[key]
+        if kind == "set":
+            parent[path[-1]] = op[2]
+        else:
+            del parent[path[-1]]
+    return doc
+
+
+def _rebuild(entries: list[dict]) -> Any:
+    """Replay a chain that starts with a snapshot or deletion; returns None for deleted resources."""
+    doc = None
+    for entry in entries:
+        if entry["kind"] == SNAPSHOT:
+            doc = copy.deepcopy(entry["body"])
+        elif entry["kind"] == DELTA:
+            doc = apply_delta(doc, entry["body"])
+        else:
+            doc = None
+    return doc
+
+
+class HistoryStore:
+
+    """Reconstructs documents from the stored version chains."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def _chain(self, uid: str, version: int) -> list[dict]:
+        start = self.client.find_history_version(uid, before_version=version, kinds=(SNAPSHOT, DELETED))
+        if start is None:
+            return []
+        return self.client.load_history(uid, start, version)
+
+    def latest_version(self, uid: str) -> int | None:
+        return self.client.find_history_version(uid)
+
+    def get_version(self, uid: str, version: int) -> dict[str, Any] | None:
+        """Return the document as of `version`, or None if it did not exist or was deleted."""
+        return _rebuild(self._chain(uid, version))
+
+    def get_at(self, uid: str, ts: datetime) -> dict[str, Any] | None:
+        """Return the document as it was at `ts`."""
+        version = self.client.find_history_version(uid, before_ts=ts)
+        return None if version is None else self.get_version(uid, version)
+
+    def get_range(self, uid: str, since: datetime, until: datetime | None = None) -> list[dict]:
+        """Return every version recorded between `since` and `until`.
+
+        The state at `since` is rebuilt once, then the later entries are
+        replayed in a single pass. Each item holds version, ts, kind and doc.
+        """
+        first = self.client.find_history_version(uid, before_ts=since)
+        if first is None:
+            first = 0
+        start = self.client.find_history_version(uid, before_version=first, kinds=(SNAPSHOT, DELETED)) or 0
+        end = None
+        if until is not None:
+            end = self.client.find_history_version(uid, before_ts=until)
+            if end is None:
+                return []
+        versions = []
+        doc = None
+        for entry in self.client.load_history(uid, start, end):
+            doc = _rebuild([entry]) if entry["kind"] != DELTA else apply_delta(doc, entry["body"])
+            if entry["ts"] >= since:
+                versions.append(
+                    {"version": entry["version"], "ts": entry["ts"], "kind": entry["kind"], "doc": copy.deepcopy(doc)}
+                )
+        return versions
+
+
+class _ChainHead:
+    __slots__ = ("version", "doc", "snapshot_version", "snapshot_ts")
+
+    def __init__(self, version: int, doc: Any, snapshot_version: int, snapshot_ts: datetime):
+        self.version = version
+        self.doc = doc
+        self.snapshot_version = snapshot_version
+        self.snapshot_ts = snapshot_ts
+
+
+class HistoryRecorder:
+
+    """Appends versions to the history from a background thread.
+
+    The latest version of recently changed uids is cached, so computing a
+    delta normally needs no database read; a uid that is not cached costs
+    one query when it has no history yet and two otherwise.
+    """
+
+    def __init__(
+        self,
+        client,
+        snapshot_every: int | None = None,
+        snapshot_interval: float | None = None,
+        queue_size: int | None = None,
+        cache_size: int | None = None,
+        bulk_timeout: float | None = None,
+    ):
+        self.client = client
+        self.snapshot_every = snapshot_every or int(os.getenv("HISTORY_SNAPSHOT_EVERY", "20"))
+        self.snapshot_interval = timedelta(
+            seconds=snapshot_interval or float(os.getenv("HISTORY_SNAPSHOT_INTERVAL_SECONDS", "86400"))
+        )
+        self.cache_size = cache_size or int(os.getenv("HISTORY_CACHE_SIZE", "10000"))
+        self.bulk_timeout = (
+            bulk_timeout if bulk_timeout is not None else float(os.getenv("HISTORY_BULK_TIMEOUT_SECONDS", "60"))
+        )
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or int(os.getenv("HISTORY_QUEUE_SIZE", "10000")))
+        self._heads: OrderedDict[str, _ChainHead | None] = OrderedDict()
+        self._thread: threading.Thread | None = None
+        self.dropped = 0
+
+    def record(self, resource_type: str, uid: str, doc: dict[str, Any] | None) -> None:
+        """Queue a new version of `uid`; pass None for a deletion."""
+        try:
+            self._queue.put_nowait((resource_type, uid, doc, datetime.now(timezone.utc)))
+        except queue.Full:
+            self._drop(1)
+
+    def record_many(self, rows: list[tuple[str, str, dict[str, Any]]]) -> None:
+        """Queue versions of a bulk write, waiting up to `bulk_timeout` seconds for queue space."""
+        deadline = time.monotonic() + self.bulk_timeout
+        now = datetime.now(timezone.utc)
+        for i, (resource_type, uid, doc) in enumerate(rows):
+            try:
+                self._queue.put((resource_type, uid, doc, now), timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                self._drop(len(rows) - i)
+                return
+
+    def _drop(self, count: int) -> None:
+        previous = self.dropped
+        self.dropped += count
+        if previous // 1000 != self.dropped // 1000 or previous == 0:
+            logger.warning(f"History queue is full, dropped {self.dropped} versions so far")
+
+    def _head(self, uid: str) -> _ChainHead | None:
+        if uid in self._heads:
+            self._heads.move_to_end(uid)
+            return self._heads[uid]
+        # The compactor may delete the chain start between the two queries; look it up again then
+        for _ in range(3):
+            start = self.client.find_history_version(uid, kinds=(SNAPSHOT, DELETED))
+            if start is None:
+                return None
+            entries = self.client.load_history(uid, start, None)
+            if entries:
+                snapshot = next((e for e in reversed(entries) if e["kind"] == SNAPSHOT), entries[0])
+                return _ChainHead(entries[-1]["version"], _rebuild(entries), snapshot["version"], snapshot["ts"])
+        return None
+
+    def _remember(self, uid: str, head: _ChainHead) -> None:
+        self._heads[uid] = head
+        self._heads.move_to_end(uid)
+        while len(self._heads) > self.cache_size:
+            self._heads.popitem(last=False)
+
+    def write(self, resource_type: str, uid: str, doc: dict[str, Any] | None, ts: datetime) -> bool:
+        """Append one version to the history; returns False when nothing changed."""
+        head = self._head(uid)
+        version = head.version + 1 if head else 1
+
+        if doc is None:
+            if head is None or head.doc is None:
+                return False
+            kind, body = DELETED, None
+        elif head is None or head.doc is None:
+            kind, body = SNAPSHOT, doc
+        else:
+            ops = diff(head.doc, doc)
+            if not ops:
+                return False
+            due = (
+                version - head.snapshot_version >= self.snapshot_every
+                or ts - head.snapshot_ts >= self.snapshot_interval
+            )
+            # A delta that is not much smaller than the document only lengthens the chain
+            if due or len(json.dumps(ops)) * 2 > len(json.dumps(doc)):
+                kind, body = SNAPSHOT, doc
+            else:
+                kind, body = DELTA, ops
+
+        entry = {"uid": uid, "version": version, "resource_type": resource_type, "ts": ts, "kind": kind, "body": body}
+        if not self.client.put_history_entry(entry):
+            # Forget the cached head so the next version starts from what is stored
+            self._heads.pop(uid, None)
+            raise RuntimeError(f"Failed to store history version {version} of {uid}")
+
+        if kind == SNAPSHOT:
+            snapshot_version, snapshot_ts = version, ts
+        else:
+            snapshot_version = head.snapshot_version
+            snapshot_ts = head.snapshot_ts
+        self._remember(uid, _ChainHead(version, copy.deepcopy(doc), snapshot_version, snapshot_ts))
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.write(*item)
+            except Exception as e:
+                logger.error(f"Failed to record history of {item[1]}: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="history-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write the queued versions and stop."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+
+class HistoryCompactor:
+
+    """Bounds history growth by retention time and number of versions per uid."""
+
+    def __init__(
+        self,
+        client,
+        retention_seconds: float | None = None,
+        max_versions: int | None = None,
+        interval: float | None = None,
+    ):
+        self.client = client
+        self.store = HistoryStore(client)
+        self.retention = timedelta(
+            seconds=retention_seconds or float(os.getenv("HISTORY_RETENTION_SECONDS", str(90 * 86400)))
+        )
+        self.max_versions = max_versions or int(os.getenv("HISTORY_MAX_VERSIONS", "1000"))
+        self.interval = interval or float(os.getenv("HISTORY_COMPACT_INTERVAL_SECONDS", "3600"))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def compact(self, now: datetime | None = None) -> int:
+        """Drop expired versions and return the number of entries deleted."""
+        cutoff = (now or datetime.now(timezone.utc)) - self.retention
+        deleted = 0
+        for uid, latest in self.client.history_compaction_candidates(cutoff, self.max_versions):
+            deleted += self._compact_uid(uid, latest, cutoff)
+        if deleted:
+            logger.info(f"Compacted history, deleted {deleted} entries")
+        return deleted
+
+    def _compact_uid(self, uid: str, latest: int, cutoff: datetime) -> int:
+        # Oldest version to keep: the first one recorded after the cutoff, but
+        # at most max_versions back. The latest version is always kept unless
+        # it is an expired deletion.
+        last_expired = self.client.find_history_version(uid, before_ts=cutoff)
+        keep_from = max(latest - self.max_versions + 1, (last_expired or 0) + 1)
+        if keep_from > latest:
+            last = self.client.load_history(uid, latest, latest)[0]
+            if last["kind"] == DELETED:
+                return self.client.delete_history_before(uid, latest + 1)
+            keep_from = latest
+
+        first_kept = self.client.load_history(uid, keep_from, keep_from)[0]
+        if first_kept["kind"] == DELTA:
+            # Materialize the new start of the chain before its base is deleted
+            first_kept["kind"] = SNAPSHOT
+            first_kept["body"] = self.store.get_version(uid, keep_from)
+            if not self.client.put_history_entry(first_kept):
+                raise RuntimeError(f"Failed to rewrite history version {keep_from} of {uid}")
+        return self.client.delete_history_before(uid, keep_from)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"History compaction failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="history-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def history_enabled() -> bool:
+    return os.getenv("HISTORY_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _utc_datetime(value: str) -> datetime:
+    """Parse an ISO 8601 time, treating times without a zone as UTC."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from database import DatabaseFactory
+
+    parser = argparse.ArgumentParser(description="Print recorded versions of a resource")
+    parser.add_argument("uid")
+    parser.add_argument("--version", type=int, help="Version to rebuild (default: latest)")
+    parser.add_argument("--at", type=_utc_datetime, help="Rebuild the document as it was at this time")
+    parser.add_argument("--since", type=_utc_datetime, help="Print every version since this time")
+    parser.add_argument("--until", type=_utc_datetime, help="End of the --since range")
+    args = parser.parse_args()
+
+    load_dotenv()
+    client = DatabaseFactory.create_client()
+    client.connect()
+    try:
+        store = HistoryStore(client)
+        if args.since:
+            result = store.get_range(args.uid, args.since, args.until)
+        elif args.at:
+            result = store.get_at(args.uid, args.at)
+        else:
+            version = args.version or store.latest_version(args.uid)
+            result = store.get_version(args.uid, version) if version else None
+        print(json.dumps(result, indent=2, default=str))
+    finally:
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
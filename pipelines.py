@@ -0,0 +1,292 @@
+"""Per-resource-type write pipelines for the gRPC receiver service.
+
+Without pipelines every resource type competes for the same gRPC worker
+threads, so a flood of heavy vulnerability reports delays the small namespace
+and config audit updates that dashboards rely on. Each pipeline has its own
+writer threads, batch size and bounded backlog:
+
+- resource types listed in WRITE_PIPELINES get a pipeline of their own
+- all other resource types share the "default" pipeline
+- SyncNamespace writes go through the "namespace" pipeline
+
+WRITE_PIPELINES is a JSON object mapping a pipeline name to its settings,
+for example:
+
+    {"vulnerabilityreports": {"workers": 4, "batch_size": 100, "max_backlog": 200},
+     "namespace": {"workers": 1}}
+
+Settings that are left out fall back to PIPELINE_WORKERS, PIPELINE_BATCH_SIZE
+and PIPELINE_MAX_BACKLOG. Given a `client_factory`, every pipeline writes
+through a database client of its own, so on Postgres a slow bulk write of one
+pipeline does not hold the connection the other pipelines write through.
+
+When a pipeline's backlog is full further writes are rejected immediately
+with `PipelineFull` instead of tying up gRPC threads that other pipelines
+need. Backlog and latency of every pipeline are logged
+every PIPELINE_STATS_INTERVAL_SECONDS.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+logger = logging.getLogger("grpc-receiver")
+
+DEFAULT_PIPELINE = "default"
+NAMESPACE_PIPELINE = "namespace"
+
+# Bulk client methods used to write a run of consecutive single upserts
+_BULK_METHODS = {
+    "upsert_resource": "bulk_upsert_resources",
+    "upsert_namespace": "bulk_upsert_namespaces",
+}
+
+
+class PipelineFull(RuntimeError):
+    pass
+
+
+class _Write:
+    __slots__ = ("method", "args", "future", "enqueued")
+
+    def __init__(self, method: str, args: tuple):
+        self.method = method
+        self.args = args
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class WritePipeline:
+
+    """Writes documents with a fixed number of threads, batching queued upserts."""
+
+    def __init__(self, name: str, client, workers: int = 2, batch_size: int = 32, max_backlog: int = 32):
+        self.name = name
+        self.client = client
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_backlog = max_backlog
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_backlog)
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=1024)
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, method: str, *args) -> Future:
+        """Queue a call of `method` on the database client."""
+        write = _Write(method, args)
+        try:
+            self._queue.put_nowait(write)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise PipelineFull(f"Write pipeline {self.name} is full, retry later") from None
+        return write.future
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list[_Write]) -> None:
+        # Consecutive upserts are written together; anything else flushes the
+        # run first so writes for the same uid keep their order.
+        run: list[_Write] = []
+        for write in batch:
+            if run and write.method != run[0].method:
+                self._write_run(run)
+                run = []
+            if write.method in _BULK_METHODS:
+                run.append(write)
+            else:
+                self._write_run([write])
+        if run:
+            self._write_run(run)
+
+    def _write_run(self, run: list[_Write]) -> None:
+        if len(run) > 1:
+            try:
+                bulk = getattr(self.client, _BULK_METHODS[run[0].method])
+                result = bulk([write.args for write in run])
+            except Exception as e:
+                logger.warning(f"Bulk write in pipeline {self.name} failed, retrying one by one: {e}")
+                result = False
+            if result:
+                for write in run:
+                    write.future.set_result(result)
+            else:
+                # Retried one by one so that a single bad document only fails its own caller
+                for write in run:
+                    self._write_one(write)
+        else:
+            self._write_one(run[0])
+
+        now = time.monotonic()
+        with self._lock:
+            self.completed += len(run)
+            self._latencies.extend(now - write.enqueued for write in run)
+
+    def _write_one(self, write: _Write) -> None:
+        try:
+            write.future.set_result(getattr(self.client, write.method)(*write.args))
+        except Exception as e:
+            write.future.set_exception(e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            completed, rejected = self.completed, self.rejected
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            "backlog": self._queue.qsize(),
+            "completed": completed,
+            "rejected": rejected,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the workers and fail the writes that are still queued."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        # Callers wait on these futures without a timeout, so they must complete
+        while True:
+            try:
+                write = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            write.future.set_exception(PipelineFull(f"Write pipeline {self.name} stopped, retry later"))
+
+
+class WritePipelines:
+
+    """Routes writes to the pipeline of their resource type.
+
+    Exposes the write methods of the database clients, so the service can
+    use it in place of the client.
+    """
+
+    def __init__(
+        self,
+        client,
+        config: dict[str, dict] | None = None,
+        stats_interval: float | None = None,
+        client_factory: Callable[[], Any] | None = None,
+    ):
+        if config is None:
+            config = json.loads(os.getenv("WRITE_PIPELINES", "{}"))
+        defaults = {
+            "workers": int(os.getenv("PIPELINE_WORKERS", "2")),
+            "batch_size": int(os.getenv("PIPELINE_BATCH_SIZE", "32")),
+            "max_backlog": int(os.getenv("PIPELINE_MAX_BACKLOG", "32")),
+        }
+        self.stats_interval = stats_interval or float(os.getenv("PIPELINE_STATS_INTERVAL_SECONDS", "60"))
+
+        self._pipelines: dict[str, WritePipeline] = {}
+        self._own_clients: list = []
+        for name in {DEFAULT_PIPELINE, NAMESPACE_PIPELINE, *config}:
+            settings = config.get(name, {})
+            unknown = set(settings) - set(defaults)
+            if unknown:
+                raise RuntimeError(f"Unknown settings for write pipeline {name}: {', '.join(sorted(unknown))}")
+            pipeline_client = client
+            if client_factory is not None:
+                pipeline_client = client_factory()
+                self._own_clients.append(pipeline_client)
+            self._pipelines[name] = WritePipeline(name, pipeline_client, **{**defaults, **settings})
+
+        self._stop = threading.Event()
+        self._reporter: threading.Thread | None = None
+
+    @property
+    def thread_budget(self) -> int:
+        """Number of gRPC threads needed so that no pipeline can starve the others.
+
+        Callers stay blocked while their write is queued or part of a batch
+        being written, so a pipeline can hold `workers * batch_size` plus
+        `max_backlog` threads.
+        """
+        return sum(p.workers * p.batch_size + p.max_backlog for p in self._pipelines.values())
+
+    def _pipeline_for(self, resource_type: str) -> WritePipeline:
+        # The namespace pipeline only serves the namespace RPC
+        if resource_type == NAMESPACE_PIPELINE:
+            return self._pipelines[DEFAULT_PIPELINE]
+        return self._pipelines.get(resource_type, self._pipelines[DEFAULT_PIPELINE])
+
+    def upsert_resource(self, resource_type: str, uid: str, doc: dict) -> bool:
+        return self._pipeline_for(resource_type).submit("upsert_resource", resource_type, uid, doc).result()
+
+    def delete_resource(self, resource_type: str, uid: str) -> bool:
+        return self._pipeline_for(resource_type).submit("delete_resource", resource_type, uid).result()
+
+    def upsert_namespace(self, uid: str, doc: dict) -> bool:
+        return self._pipelines[NAMESPACE_PIPELINE].submit("upsert_namespace", uid, doc).result()
+
+    def delete_namespace(self, uid: str) -> bool:
+        return self._pipelines[NAMESPACE_PIPELINE].submit("delete_namespace", uid).result()
+
+    def stats(self) -> dict[str, dict]:
+        return {name: pipeline.stats() for name, pipeline in sorted(self._pipelines.items())}
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats().items():
+            logger.info(
+                f"Pipeline {name}: backlog={stats['backlog']} p50={stats['p50_ms']:.1f}ms "
+                f"p99={stats['p99_ms']:.1f}ms completed={stats['completed']} rejected={stats['rejected']}"
+            )
+
+    def _report(self) -> None:
+        while not self._stop.wait(self.stats_interval):
+            self.log_stats()
+
+    def start(self) -> None:
+        for client in self._own_clients:
+            client.connect()
+        for pipeline in self._pipelines.values():
+            pipeline.start()
+        self._stop.clear()
+        self._reporter = threading.Thread(target=self._report, name="pipeline-stats", daemon=True)
+        self._reporter.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for pipeline in self._pipelines.values():
+            pipeline.stop()
+        if self._reporter is not None:
+            self._reporter.join()
+            self._reporter = None
+        for client in self._own_clients:
+            client.disconnect()
@@ -0,0 +1,109 @@
+"""On-demand sampling profiler for the live gRPC receiver service.
+
+Sending PROFILE_SIGNAL (SIGUSR2 by default) to the process samples the stacks
+of every thread for PROFILE_SECONDS seconds and writes them to PROFILE_DIR in
+the "collapsed stack" format understood by flamegraph.pl and speedscope:
+
+    module:function;module:function;... <sample count>
+
+The profiler only uses the standard library, so it is always available.
+"""
+
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger("grpc-receiver")
+
+# Only one capture may run at a time; repeated signals are ignored meanwhile
+_capture_lock = threading.Lock()
+
+
+def _collapse_stack(frame) -> str:
+    """Render a frame and its callers as a root-first, semicolon separated stack."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        names.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(duration: float, interval: float = 0.005) -> Counter:
+    """Sample the stacks of all other threads for `duration` seconds."""
+    own_ident = threading.get_ident()
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            name = thread_names.get(ident)
+            if name is None:
+                # Thread started after the capture began, refresh the name table
+                thread_names = {t.ident: t.name for t in threading.enumerate()}
+                name = thread_names.get(ident, str(ident))
+            counts[f"{name};{_collapse_stack(frame)}"] += 1
+        time.sleep(interval)
+    return counts
+
+
+def write_collapsed(counts: Counter, path: str) -> None:
+    with open(path, "w") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def capture_profile(
+    duration: float | None = None,
+    output_dir: str | None = None,
+    interval: float | None = None,
+) -> str | None:
+    """Capture a profile and return the path of the written dump.
+
+    Returns None if another capture is already in progress.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        logger.warning("Profile capture already in progress, ignoring request")
+        return None
+    try:
+        duration = duration if duration is not None else float(os.getenv("PROFILE_SECONDS", "30"))
+        output_dir = output_dir or os.getenv("PROFILE_DIR", tempfile.gettempdir())
+        if interval is None:
+            interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+
+        logger.info(f"Capturing {duration:g}s sampling profile")
+        counts = sample_stacks(duration, interval)
+        path = os.path.join(output_dir, f"shield-receiver-{os.getpid()}-{int(time.time())}.collapsed")
+        write_collapsed(counts, path)
+        logger.info(f"Wrote profile with {sum(counts.values())} samples to {path}")
+        return path
+    finally:
+        _capture_lock.release()
+
+
+def install_signal_handler() -> bool:
+    """Trigger `capture_profile()` in a background thread on PROFILE_SIGNAL.
+
+    Must be called from the main thread. Returns False when the signal is not
+    available on this platform.
+    """
+    signal_name = os.getenv("PROFILE_SIGNAL", "SIGUSR2").upper()
+    signum = getattr(signal, signal_name, None)
+    if signum is None:
+        logger.warning(f"Profiling signal {signal_name} is not available on this platform")
+        return False
+
+    def _handle(_signum, _frame):
+        threading.Thread(target=capture_profile, name="profiler", daemon=True).start()
+
+    signal.signal(signum, _handle)
+    logger.info(f"Send {signal_name} to pid {os.getpid()} to capture a profile")
+    return True
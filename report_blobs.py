@@ -0,0 +1,182 @@
+"""Content-addressed storage of large, duplicated scan report sections.
+
+Every replica of an image produces its own VulnerabilityReport, but the
+vulnerability list is the same for all of them. With DEDUP_REPORTS=true the
+database clients move every list in `data.report` whose JSON encoding is at
+least DEDUP_MIN_BYTES long into a shared `report_blobs` collection/table,
+keyed on the artifact digest plus the SHA-256 of the list. The document keeps
+a `{"_blob": key}` reference in its place and lists all of its keys in a
+top-level `_blobs` field. Reads put the sections back transparently.
+
+Blobs that are no longer referenced are garbage collected periodically by
+`ReportBlobCollector`. A blob is only collected once it has not been written
+for REPORT_BLOB_GRACE_SECONDS, which protects blobs whose referencing document
+is still being written.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger("grpc-receiver")
+
+BLOB_REF = "_blob"
+BLOBS_FIELD = "_blobs"
+
+
+def grace_seconds() -> float:
+    return float(os.getenv("REPORT_BLOB_GRACE_SECONDS", "3600"))
+
+
+def split_report(doc: dict[str, Any], min_bytes: int) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Move large list sections of `data.report` out of `doc`.
+
+    Returns the document to store, with blob references in place of the
+    sections, and the blobs to store keyed by content key. `doc` itself is not
+    modified.
+    """
+    data = doc.get("data")
+    report = data.get("report") if isinstance(data, dict) else None
+    if not isinstance(report, dict):
+        return doc, {}
+
+    artifact = report.get("artifact")
+    digest = artifact.get("digest", "") if isinstance(artifact, dict) else ""
+    blobs = {}
+    new_report = dict(report)
+    for field, value in report.items():
+        if not isinstance(value, list):
+            continue
+        body = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        if len(body) < min_bytes:
+            continue
+        content_hash = hashlib.sha256(body.encode()).hexdigest()
+        key = f"{digest}:{content_hash}" if digest else content_hash
+        blobs[key] = value
+        new_report[field] = {BLOB_REF: key}
+
+    if not blobs:
+        return doc, {}
+    new_doc = dict(doc)
+    new_doc["data"] = dict(data, report=new_report)
+    new_doc[BLOBS_FIELD] = sorted(blobs)
+    return new_doc, blobs
+
+
+def assemble_report(doc: dict[str, Any], load_blob: Callable[[str], Any]) -> dict[str, Any]:
+    """Replace the blob references of a stored document with the blob contents."""
+    if BLOBS_FIELD not in doc:
+        return doc
+    doc = dict(doc)
+    del doc[BLOBS_FIELD]
+    report = dict(doc["data"]["report"])
+    for field, value in report.items():
+        if isinstance(value, dict) and set(value) == {BLOB_REF}:
+            body = load_blob(value[BLOB_REF])
+            if body is None:
+                logger.warning(f"Report blob {value[BLOB_REF]} is missing, leaving reference in place")
+                continue
+            report[field] = copy.deepcopy(body)
+    doc["data"] = dict(doc["data"], report=report)
+    return doc
+
+
+class RecentBlobs:
+
+    """Remembers which blobs this process wrote recently.
+
+    A blob written less than half a grace period ago cannot have been
+    collected yet, so writing it again can be skipped.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._written: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def unwritten(self, keys) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [k for k in keys if now - self._written.get(k, -self.ttl_seconds) >= self.ttl_seconds]
+
+    def mark_written(self, keys) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._written[key] = now
+            # Keep the table bounded to recently written keys
+            if len(self._written) > 100000:
+                self._written = {k: t for k, t in self._written.items() if now - t < self.ttl_seconds}
+
+
+class BlobCache:
+
+    """Small LRU cache in front of a blob loader.
+
+    Blobs are immutable, so loaded blobs can be shared. Missing blobs are not
+    cached: a blob may be written right after a failed lookup.
+    """
+
+    def __init__(self, load_blob: Callable[[str], Any], maxsize: int = 256):
+        self.load_blob = load_blob
+        self.maxsize = maxsize
+        self._blobs: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, key: str) -> Any:
+        with self._lock:
+            if key in self._blobs:
+                self._blobs.move_to_end(key)
+                return self._blobs[key]
+        body = self.load_blob(key)
+        if body is not None:
+            with self._lock:
+                self._blobs[key] = body
+                while len(self._blobs) > self.maxsize:
+                    self._blobs.popitem(last=False)
+        return body
+
+
+class ReportBlobCollector:
+
+    """Periodically deletes report blobs that no document references."""
+
+    def __init__(self, client, interval: float | None = None, grace: float | None = None):
+        self.client = client
+        self.interval = interval or float(os.getenv("REPORT_BLOB_GC_INTERVAL_SECONDS", "3600"))
+        self.grace = grace if grace is not None else grace_seconds()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def collect(self) -> int:
+        deleted = self.client.collect_report_blobs(self.grace)
+        if deleted:
+            logger.info(f"Collected {deleted} unreferenced report blobs")
+        return deleted
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Report blob collection failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="report-blob-collector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
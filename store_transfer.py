@@ -0,0 +1,216 @@
+"""Stream the full store to compressed NDJSON files and load it back.
+
+Exports read every resource type and the namespaces from the database
+selected by DATABASE_TYPE and write them as gzip-compressed NDJSON chunks:
+
+    <dir>/manifest.json
+    <dir>/resources/<resource_type>/part-00000.ndjson.gz
+    <dir>/namespaces/part-00000.ndjson.gz
+
+Each line holds one document as {"uid": ..., "doc": ...}. Imports load an
+export into any DatabaseFactory backend with bulk writes, one worker per
+resource type. Completed chunk files are recorded in a checkpoint file kept
+per target database, so an interrupted import resumes where it stopped while
+the same export can still be loaded into other databases. Both directions stream, so memory
+use does not grow with the size of the store.
+
+    DATABASE_TYPE=mongo python store_transfer.py export /tmp/shield-export
+    DATABASE_TYPE=postgres python store_transfer.py import /tmp/shield-export
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent import futures
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+logger = logging.getLogger("grpc-receiver")
+
+MANIFEST = "manifest.json"
+CHECKPOINT = "import-{target}.checkpoint"
+FORMAT_VERSION = 1
+
+
+def _write_chunks(
+    rows: Iterable[tuple[str, dict]], export_dir: str, relative_dir: str, chunk_rows: int
+) -> list[dict]:
+    """Write (uid, doc) rows to numbered chunk files and describe them."""
+    os.makedirs(os.path.join(export_dir, relative_dir), exist_ok=True)
+    chunks: list[dict] = []
+    out = None
+    try:
+        for uid, doc in rows:
+            if out is None or chunks[-1]["rows"] >= chunk_rows:
+                if out is not None:
+                    out.close()
+                path = f"{relative_dir}/part-{len(chunks):05d}.ndjson.gz"
+                out = gzip.open(os.path.join(export_dir, path), "wt", encoding="utf-8")
+                chunks.append({"file": path, "rows": 0})
+            out.write(json.dumps({"uid": uid, "doc": doc}, separators=(",", ":")))
+            out.write("\n")
+            chunks[-1]["rows"] += 1
+    finally:
+        if out is not None:
+            out.close()
+    return chunks
+
+
+def export_store(client, export_dir: str, chunk_rows: int = 50000, workers: int = 4) -> dict:
+    """Export every resource type and the namespaces, returning the manifest."""
+    os.makedirs(export_dir, exist_ok=True)
+    # Leftover chunks or checkpoints would be mistaken for parts of this export
+    if os.listdir(export_dir):
+        raise RuntimeError(f"Export directory {export_dir} is not empty")
+    resource_types = client.list_resource_types()
+
+    def export_type(resource_type: str) -> list[dict]:
+        start = time.monotonic()
+        relative_dir = f"resources/{quote(resource_type, safe='')}"
+        chunks = _write_chunks(client.iter_resources(resource_type), export_dir, relative_dir, chunk_rows)
+        rows = sum(c["rows"] for c in chunks)
+        logger.info(f"Exported {rows} {resource_type} in {time.monotonic() - start:.1f}s")
+        return chunks
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        resource_jobs = {t: pool.submit(export_type, t) for t in resource_types}
+        namespace_job = pool.submit(_write_chunks, client.iter_namespaces(), export_dir, "namespaces", chunk_rows)
+        manifest = {
+            "version": FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": os.getenv("DATABASE_TYPE", "mongo").lower(),
+            "resources": {t: job.result() for t, job in resource_jobs.items()},
+            "namespaces": namespace_job.result(),
+        }
+
+    # Written last, so an export without a manifest is known to be incomplete
+    with open(os.path.join(export_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _read_chunk(export_dir: str, path: str) -> Iterator[tuple[str, dict]]:
+    with gzip.open(os.path.join(export_dir, path), "rt", encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            yield row["uid"], row["doc"]
+
+
+class _Checkpoint:
+
+    """Append-only record of the chunk files that were imported completely."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: set[str] = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    def mark_done(self, chunk_file: str) -> None:
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(chunk_file + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done.add(chunk_file)
+
+
+def default_checkpoint(export_dir: str, client) -> str:
+    """Checkpoint file of importing `export_dir` into the database of `client`."""
+    target = "|".join(str(getattr(client, attr, "")) for attr in ("uri", "host", "port", "db_name"))
+    # Hashed, so credentials in a URI do not end up in the file name
+    digest = hashlib.sha256(f"{type(client).__name__}|{target}".encode()).hexdigest()[:16]
+    return os.path.join(export_dir, CHECKPOINT.format(target=digest))
+
+
+def import_store(client, export_dir: str, workers: int = 4, checkpoint_path: str | None = None) -> dict[str, int]:
+    """Load an export into `client` and return the number of rows imported per resource type.
+
+    Chunk files listed in the checkpoint are skipped. Re-importing a chunk
+    that was interrupted midway is safe because every write is an upsert.
+    """
+    manifest_path = os.path.join(export_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise RuntimeError(f"No {MANIFEST} in {export_dir}, the export is missing or incomplete")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise RuntimeError(f"Unsupported export format version: {manifest.get('version')}")
+
+    checkpoint = _Checkpoint(checkpoint_path or default_checkpoint(export_dir, client))
+
+    def import_chunks(name: str, chunks: list[dict], write) -> int:
+        imported = 0
+        for chunk in chunks:
+            if chunk["file"] in checkpoint.done:
+                continue
+            if not write(_read_chunk(export_dir, chunk["file"])):
+                raise RuntimeError(f"Bulk write of {chunk['file']} failed")
+            checkpoint.mark_done(chunk["file"])
+            imported += chunk["rows"]
+        logger.info(f"Imported {imported} {name}")
+        return imported
+
+    def resource_writer(resource_type: str):
+        return lambda rows: client.bulk_upsert_resources((resource_type, uid, doc) for uid, doc in rows)
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {
+            resource_type: pool.submit(import_chunks, resource_type, chunks, resource_writer(resource_type))
+            for resource_type, chunks in manifest["resources"].items()
+        }
+        jobs["namespace"] = pool.submit(
+            import_chunks, "namespaces", manifest["namespaces"], client.bulk_upsert_namespaces
+        )
+        return {name: job.result() for name, job in jobs.items()}
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+
+    from database import DatabaseFactory
+
+    parser = argparse.ArgumentParser(description="Export the store to NDJSON files or import it into a backend")
+    parser.add_argument("--database-type", help="Override DATABASE_TYPE for this run")
+    parser.add_argument("--workers", type=int, default=4, help="Resource types processed in parallel")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write every document to compressed NDJSON chunks")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--chunk-rows", type=int, default=50000, help="Documents per chunk file")
+    import_parser = commands.add_parser("import", help="Bulk load an export into the database")
+    import_parser.add_argument("directory")
+    import_parser.add_argument(
+        "--checkpoint", help="Checkpoint file (default: one per target database in <directory>)"
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    if args.database_type:
+        os.environ["DATABASE_TYPE"] = args.database_type
+
+    client = DatabaseFactory.create_client()
+    client.connect()
+    try:
+        if args.command == "export":
+            manifest = export_store(client, args.directory, chunk_rows=args.chunk_rows, workers=args.workers)
+            total = sum(c["rows"] for chunks in manifest["resources"].values() for c in chunks)
+            total += sum(c["rows"] for c in manifest["namespaces"])
+            print(f"Exported {total} documents to {args.directory}")
+        else:
+            counts = import_store(client, args.directory, workers=args.workers, checkpoint_path=args.checkpoint)
+            print(f"Imported {sum(counts.values())} documents from {args.directory}")
+    finally:
+        client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import sync_service_pb2 as sync__service__pb2
+
+GRPC_GENERATED_VERSION = '1.84.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + ' but the generated code in sync_service_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class SyncServiceStub:
+    """The sync service definition
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.SyncResource = channel.unary_unary(
+                '/sync_service.SyncService/SyncResource',
+                request_serializer=sync__service__pb2.SyncResourceRequest.SerializeToString,
+                response_deserializer=sync__service__pb2.SyncResourceResponse.FromString,
+                _registered_method=True)
+        self.SyncNamespace = channel.unary_unary(
+                '/sync_service.SyncService/SyncNamespace',
+                request_serializer=sync__service__pb2.SyncNamespaceRequest.SerializeToString,
+                response_deserializer=sync__service__pb2.SyncNamespaceResponse.FromString,
+                _registered_method=True)
+        self.Heartbeat = channel.unary_unary(
+                '/sync_service.SyncService/Heartbeat',
+                request_serializer=sync__service__pb2.HeartbeatRequest.SerializeToString,
+                response_deserializer=sync__service__pb2.HeartbeatResponse.FromString,
+                _registered_method=True)
+        self.InitialSync = channel.stream_unary(
+                '/sync_service.SyncService/InitialSync',
+                request_serializer=sync__service__pb2.InitialSyncRequest.SerializeToString,
+                response_deserializer=sync__service__pb2.InitialSyncResponse.FromString,
+                _registered_method=True)
+
+
+class SyncServiceServicer:
+    """The sync service definition
+    """
+
+    def SyncResource(self, request, context):
+        """Sync a resource to the receiver
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SyncNamespace(self, request, context):
+        """Sync a namespace to the receiver
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Heartbeat(self, request, context):
+        """Renew the lease of a cluster that has no other traffic to send
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def InitialSync(self, request_iterator, context):
+        """Stream a controller's full inventory in one call, stored with bulk writes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_SyncServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'SyncResource': grpc.unary_unary_rpc_method_handler(
+                    servicer.SyncResource,
+                    request_deserializer=sync__service__pb2.SyncResourceRequest.FromString,
+                    response_serializer=sync__service__pb2.SyncResourceResponse.SerializeToString,
+            ),
+            'SyncNamespace': grpc.unary_unary_rpc_method_handler(
+                    servicer.SyncNamespace,
+                    request_deserializer=sync__service__pb2.SyncNamespaceRequest.FromString,
+                    response_serializer=sync__service__pb2.SyncNamespaceResponse.SerializeToString,
+            ),
+            'Heartbeat': grpc.unary_unary_rpc_method_handler(
+                    servicer.Heartbeat,
+                    request_deserializer=sync__service__pb2.HeartbeatRequest.FromString,
+                    response_serializer=sync__service__pb2.HeartbeatResponse.SerializeToString,
+            ),
+            'InitialSync': grpc.stream_unary_rpc_method_handler(
+                    servicer.InitialSync,
+                    request_deserializer=sync__service__pb2.InitialSyncRequest.FromString,
+                    response_serializer=sync__service__pb2.InitialSyncResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'sync_service.SyncService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('sync_service.SyncService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class SyncService:
+    """The sync service definition
+    """
+
+    @staticmethod
+    def SyncResource(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/sync_service.SyncService/SyncResource',
+            sync__service__pb2.SyncResourceRequest.SerializeToString,
+            sync__service__pb2.SyncResourceResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SyncNamespace(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/sync_service.SyncService/SyncNamespace',
+            sync__service__pb2.SyncNamespaceRequest.SerializeToString,
+            sync__service__pb2.SyncNamespaceResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Heartbeat(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/sync_service.SyncService/Heartbeat',
+            sync__service__pb2.HeartbeatRequest.SerializeToString,
+            sync__service__pb2.HeartbeatResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def InitialSync(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/sync_service.SyncService/InitialSync',
+            sync__service__pb2.InitialSyncRequest.SerializeToString,
+            sync__service__pb2.InitialSyncResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
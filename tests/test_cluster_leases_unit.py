@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from cluster_leases import ClusterLeaseTracker, ClusterSweeper
+
+
+def test_tracker_throttles_lease_renewals():
+    client = MagicMock()
+    client.touch_cluster.return_value = True
+    tracker = ClusterLeaseTracker(client, refresh_seconds=60)
+
+    tracker.observe("c1")
+    tracker.observe("c1")
+    tracker.observe("c2")
+
+    assert client.touch_cluster.call_count == 2
+
+
+def test_tracker_retries_after_failed_renewal():
+    client = MagicMock()
+    client.touch_cluster.side_effect = [RuntimeError("down"), True]
+    tracker = ClusterLeaseTracker(client, refresh_seconds=60)
+
+    tracker.observe("c1")
+    tracker.observe("c1")
+
+    assert client.touch_cluster.call_count == 2
+
+
+def test_tracker_heartbeat_bypasses_throttle():
+    client = MagicMock()
+    client.touch_cluster.return_value = True
+    tracker = ClusterLeaseTracker(client, refresh_seconds=60)
+
+    tracker.observe("c1")
+    assert tracker.heartbeat("c1") is True
+    assert client.touch_cluster.call_count == 2
+
+
+def _client_with_leases():
+    now = datetime.now(timezone.utc)
+    client = MagicMock()
+    client.list_cluster_leases.return_value = {
+        "gone": now - timedelta(days=30),
+        "live": now,
+    }
+    client.list_data_clusters.return_value = {"gone", "live"}
+    return client
+
+
+def test_sweeper_purges_expired_cluster_in_batches():
+    client = _client_with_leases()
+    client.purge_cluster_batch.side_effect = [2, 2, 1, 0]
+    sweeper = ClusterSweeper(client, ttl_seconds=86400, batch_size=2, batch_delay=0, dry_run=False)
+
+    assert sweeper.sweep() == {"gone": 5}
+    assert all(c.args == ("gone", 2) for c in client.purge_cluster_batch.call_args_list)
+    client.delete_cluster_lease.assert_called_once_with("gone")
+
+
+def test_sweeper_stops_when_cluster_renews():
+    client = _client_with_leases()
+    expired = dict(client.list_cluster_leases.return_value)
+    renewed = dict(expired, gone=datetime.now(timezone.utc))
+    # Lease adoption, the sweep's expiry check, then one check per purge batch
+    client.list_cluster_leases.side_effect = [expired, expired, expired, renewed]
+    client.purge_cluster_batch.return_value = 2
+    sweeper = ClusterSweeper(client, ttl_seconds=86400, batch_size=2, batch_delay=0, dry_run=False)
+
+    assert sweeper.sweep() == {"gone": 2}
+    client.delete_cluster_lease.assert_not_called()
+
+
+def test_sweeper_dry_run_deletes_nothing():
+    client = _client_with_leases()
+    client.count_cluster_documents.return_value = 7
+    sweeper = ClusterSweeper(client, ttl_seconds=86400, dry_run=True)
+
+    client.list_data_clusters.return_value = {"gone", "live", "old"}
+
+    report = sweeper.report()
+    assert [(e["cluster"], e["last_seen"] is None, e["documents"]) for e in report] == [
+        ("gone", False, 7),
+        ("old", True, 7),
+    ]
+    assert sweeper.sweep() == {}
+    client.purge_cluster_batch.assert_not_called()
+    # Clusters without a lease are only reported, the expiry clock does not start
+    client.add_cluster_lease.assert_not_called()
+
+
+def test_sweeper_adopts_clusters_without_lease_once():
+    client = _client_with_leases()
+    client.list_data_clusters.return_value = {"gone", "live", "old"}
+    client.add_cluster_lease.return_value = True
+    client.purge_cluster_batch.return_value = 0
+    sweeper = ClusterSweeper(client, ttl_seconds=86400, batch_delay=0, dry_run=False)
+
+    sweeper.sweep()
+    sweeper.sweep()
+
+    # The lease starts now, so "old" is purged one TTL later rather than immediately
+    client.add_cluster_lease.assert_called_once()
+    assert client.add_cluster_lease.call_args.args[0] == "old"
+    assert [c.args[0] for c in client.purge_cluster_batch.call_args_list] == ["gone", "gone"]
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -65,3 +66,133 @@ def test_namespace_upsert_and_delete(mock_mongo_client):
     mock_coll.delete_one.return_value.deleted_count = 1
     res = client.delete_namespace("ns-1")
     assert res is True
+
+
+@patch("database.MongoClient")
+def test_mongo_purge_cluster_batch_skips_internal_collections(mock_mongo_client):
+    mock_client_instance = MagicMock()
+    mock_db = MagicMock()
+    mock_coll = MagicMock()
+    mock_client_instance.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_coll
+    mock_db.list_collection_names.return_value = ["pods", "cluster_leases"]
+    mock_mongo_client.return_value = mock_client_instance
+    mock_coll.find.return_value.limit.return_value = [{"_id": "uid-1"}, {"_id": "uid-2"}]
+    mock_coll.delete_many.return_value.deleted_count = 2
+
+    client = MongoDatabaseClient(uri="mongodb://localhost:27017", db_name="shield_test")
+    client.connect()
+
+    assert client.purge_cluster_batch("gone", 10) == 2
+    mock_db.__getitem__.assert_any_call("pods")
+    assert "cluster_leases" not in [c.args[0] for c in mock_db.__getitem__.call_args_list]
+    mock_coll.delete_many.assert_called_once_with({"_id": {"$in": ["uid-1", "uid-2"]}})
+    # The _cluster index is created once per collection
+    mock_coll.create_index.assert_called_once_with([("_cluster", 1)])
+    client.purge_cluster_batch("gone", 10)
+    client.count_cluster_documents("gone")
+    assert mock_coll.create_index.call_count == 1
+
+
+@patch("database.MongoClient")
+def test_mongo_bulk_upsert_groups_by_collection(mock_mongo_client):
+    mock_client_instance = MagicMock()
+    mock_db = MagicMock()
+    mock_coll = MagicMock()
+    mock_client_instance.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_coll
+    mock_mongo_client.return_value = mock_client_instance
+
+    client = MongoDatabaseClient(uri="mongodb://localhost:27017", db_name="shield_test")
+    client.connect()
+
+    rows = [("pods", "uid-1", {"a": 1}), ("pods", "uid-2", {"a": 2}), ("services", "uid-3", {"a": 3})]
+    assert client.bulk_upsert_resources(rows) is True
+    assert mock_coll.bulk_write.call_count == 2
+    ops = mock_coll.bulk_write.call_args_list[0].args[0]
+    assert len(ops) == 2
+
+
+@patch("database.MongoClient")
+def test_mongo_dedup_stores_report_sections_once(mock_mongo_client):
+    mock_client_instance = MagicMock()
+    mock_db = MagicMock()
+    mock_client_instance.__getitem__.return_value = mock_db
+    collections = {}
+    mock_db.__getitem__.side_effect = lambda name: collections.setdefault(name, MagicMock())
+    mock_mongo_client.return_value = mock_client_instance
+
+    client = MongoDatabaseClient(uri="mongodb://localhost:27017", db_name="shield_test", dedup_reports=True)
+    client.dedup_min_bytes = 10
+    client.connect()
+
+    vulnerabilities = [{"vulnerabilityID": "CVE-2024-1"}, {"vulnerabilityID": "CVE-2024-2"}]
+    for uid in ("uid-1", "uid-2"):
+        doc = {"data": {"report": {"vulnerabilities": vulnerabilities}}}
+        assert client.upsert_resource("vulnerabilityreports", uid, doc) is True
+
+    # The blob is written once, both documents only carry the reference
+    assert collections["report_blobs"].bulk_write.call_count == 1
+    saved = collections["vulnerabilityreports"].replace_one.call_args.args[1]
+    assert set(saved["data"]["report"]["vulnerabilities"]) == {"_blob"}
+
+
+@patch("database.MongoClient")
+def test_mongo_collect_report_blobs_rechecks_age_on_delete(mock_mongo_client):
+    mock_client_instance = MagicMock()
+    mock_db = MagicMock()
+    mock_client_instance.__getitem__.return_value = mock_db
+    collections = {}
+    mock_db.__getitem__.side_effect = lambda name: collections.setdefault(name, MagicMock())
+    mock_db.list_collection_names.return_value = ["vulnerabilityreports", "report_blobs"]
+    mock_mongo_client.return_value = mock_client_instance
+
+    client = MongoDatabaseClient(uri="mongodb://localhost:27017", db_name="shield_test", dedup_reports=True)
+    client.connect()
+    collections["vulnerabilityreports"] = MagicMock()
+    collections["vulnerabilityreports"].aggregate.return_value = [{"_id": "used"}]
+    collections["report_blobs"] = MagicMock()
+    collections["report_blobs"].find.return_value = [{"_id": "used"}, {"_id": "orphan"}]
+    collections["report_blobs"].delete_many.return_value.deleted_count = 1
+
+    assert client.collect_report_blobs(60) == 1
+    delete_filter = collections["report_blobs"].delete_many.call_args.args[0]
+    assert delete_filter["_id"] == {"$in": ["orphan"]}
+    # A blob refreshed by a writer after the scan must survive the delete
+    assert delete_filter["last_seen"] == collections["report_blobs"].find.call_args.args[0]["last_seen"]
+    # Documents referencing blobs are found through a sparse index, created once per collection
+    collections["vulnerabilityreports"].create_index.assert_called_once_with([("_blobs", 1)], sparse=True)
+    client.collect_report_blobs(60)
+    assert collections["vulnerabilityreports"].create_index.call_count == 1
+
+
+@patch("database.MongoClient")
+def test_mongo_history_entries(mock_mongo_client):
+    mock_client = MagicMock()
+    mock_db = MagicMock()
+    mock_coll = MagicMock()
+    mock_client.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_coll
+    mock_mongo_client.return_value = mock_client
+
+    client = MongoDatabaseClient(uri="mongodb://localhost:27017", db_name="testdb")
+    client.connect()
+
+    ts = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    entry = {"uid": "u1", "version": 2, "resource_type": "pod", "ts": ts, "kind": "delta", "body": []}
+    assert client.put_history_entry(entry) is True
+    mock_db.__getitem__.assert_called_with("resource_history")
+    filter_doc, replacement = mock_coll.replace_one.call_args.args
+    assert filter_doc == {"_id": "u1:2"}
+    assert replacement["kind"] == "delta"
+    # The index is only created once
+    client.put_history_entry(entry)
+    assert mock_coll.create_index.call_count == 2
+
+    mock_coll.find_one.return_value = {"version": 1}
+    assert client.find_history_version("u1", before_ts=ts, kinds=("snapshot",)) == 1
+    assert mock_coll.find_one.call_args.args[0] == {"uid": "u1", "ts": {"$lte": ts}, "kind": {"$in": ["snapshot"]}}
+
+    stored = dict(entry, _id="u1:2", ts=ts.replace(tzinfo=None))
+    mock_coll.find.return_value.sort.return_value = [stored]
+    assert client.load_history("u1", 2) == [entry]
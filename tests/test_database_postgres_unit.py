@@ -73,3 +73,97 @@ def test_postgres_connect_failure_propagates(mock_connect):
     client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
     with pytest.raises(RuntimeError):
         client.connect()
+
+
+@patch("database.psycopg2.connect")
+def test_postgres_purge_cluster_batch_is_bounded(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_connect.return_value = mock_conn
+
+    client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
+    client.connect()
+
+    # The resources table fills the whole batch, so namespaces are left for the next one
+    mock_cursor.rowcount = 5
+    assert client.purge_cluster_batch("gone", 5) == 5
+    sql, params = mock_cursor.execute.call_args.args
+    assert "DELETE FROM resources" in sql
+    assert params == ("gone", 5)
+
+
+@patch("database.COPY_MIN_ROWS", 2)
+@patch("database.psycopg2.connect")
+def test_postgres_bulk_upsert_uses_copy_and_single_merge(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_connect.return_value = mock_conn
+
+    client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
+    client.connect()
+    mock_cursor.reset_mock()
+
+    rows = [("pod", f"uid-{i}", {"i": i}) for i in range(3)]
+    assert client.bulk_upsert_resources(rows) is True
+
+    copy_sql, buf = mock_cursor.copy_expert.call_args.args
+    assert copy_sql.startswith("COPY staging")
+    assert len(buf.getvalue().splitlines()) == 3
+    merges = [c.args[0] for c in mock_cursor.execute.call_args_list if "INSERT INTO resources" in c.args[0]]
+    assert len(merges) == 1
+
+
+@patch("database.COPY_MIN_ROWS", 1)
+@patch("database.psycopg2.connect")
+def test_postgres_bulk_upsert_failure_returns_false(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_connect.return_value = mock_conn
+
+    client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
+    client.connect()
+
+    mock_cursor.copy_expert.side_effect = Exception("copy failed")
+    assert client.bulk_upsert_namespaces([("ns-1", {"n": "v"})]) is False
+
+
+@patch("database.execute_values")
+@patch("database.psycopg2.connect")
+def test_postgres_small_bulk_upsert_uses_single_insert(mock_connect, mock_execute_values):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_connect.return_value = mock_conn
+
+    client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
+    client.connect()
+
+    rows = [("pod", "uid-1", {"v": 1}), ("pod", "uid-2", {"v": 2}), ("pod", "uid-1", {"v": 3})]
+    assert client.bulk_upsert_resources(rows) is True
+
+    # No dedicated COPY connection, one INSERT with the last row per uid
+    assert mock_connect.call_count == 1
+    mock_cursor.copy_expert.assert_not_called()
+    _, sql, values = mock_execute_values.call_args.args
+    assert sql.startswith("INSERT INTO resources")
+    assert [(uid, data.adapted) for uid, _, data in values] == [("uid-1", {"v": 3}), ("uid-2", {"v": 2})]
+
+
+@patch("database.psycopg2.connect")
+def test_postgres_find_history_version_builds_conditions(mock_connect):
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_connect.return_value = mock_conn
+
+    client = PostgresDatabaseClient(host="h", port=1, db_name="d", user="u", password="p")
+    client.connect()
+
+    mock_cursor.fetchone.return_value = (7,)
+    assert client.find_history_version("u1", before_version=9, kinds=("snapshot", "deleted")) == 7
+    sql, params = mock_cursor.execute.call_args.args
+    assert "FROM resource_history WHERE uid = %s AND version <= %s AND kind = ANY(%s)" in sql
+    assert params == ["u1", 9, ["snapshot", "deleted"]]
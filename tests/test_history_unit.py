@@ -0,0 +1,288 @@
+import copy
+from datetime import datetime, timedelta, timezone
+
+from history import (
+    DELETED,
+    DELTA,
+    SNAPSHOT,
+    HistoryCompactor,
+    HistoryRecorder,
+    HistoryStore,
+    _utc_datetime,
+    apply_delta,
+    diff,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeHistoryClient:
+
+    """In-memory implementation of the history methods of the database clients."""
+
+    def __init__(self):
+        self.entries: dict[tuple[str, int], dict] = {}
+
+    def put_history_entry(self, entry):
+        self.entries[(entry["uid"], entry["version"])] = copy.deepcopy(entry)
+        return True
+
+    def _of(self, uid):
+        return sorted((e for (u, _), e in self.entries.items() if u == uid), key=lambda e: e["version"])
+
+    def find_history_version(self, uid, before_version=None, before_ts=None, kinds=None):
+        versions = [
+            e["version"]
+            for e in self._of(uid)
+            if (before_version is None or e["version"] <= before_version)
+            and (before_ts is None or e["ts"] <= before_ts)
+            and (kinds is None or e["kind"] in kinds)
+        ]
+        return max(versions, default=None)
+
+    def load_history(self, uid, start_version, end_version=None):
+        return [
+            copy.deepcopy(e)
+            for e in self._of(uid)
+            if e["version"] >= start_version and (end_version is None or e["version"] <= end_version)
+        ]
+
+    def delete_history_before(self, uid, version):
+        doomed = [key for key in self.entries if key[0] == uid and key[1] < version]
+        for key in doomed:
+            del self.entries[key]
+        return len(doomed)
+
+    def history_compaction_candidates(self, cutoff, max_versions):
+        candidates = []
+        for uid in sorted({u for u, _ in self.entries}):
+            entries = self._of(uid)
+            if entries[0]["ts"] < cutoff or len(entries) > max_versions:
+                candidates.append((uid, entries[-1]["version"]))
+        return candidates
+
+
+def _report(vulnerabilities, timestamp="t1"):
+    return {
+        "_resource_type": "vulnerabilityreports",
+        "_name": "replicaset-app",
+        "data": {"report": {"updateTimestamp": timestamp, "vulnerabilities": copy.deepcopy(vulnerabilities)}},
+    }
+
+
+VULNERABILITIES = [{"vulnerabilityID": f"CVE-2024-{i}", "severity": "HIGH"} for i in range(50)]
+
+
+def test_diff_round_trips_and_stays_small():
+    old = _report(VULNERABILITIES)
+    fixed = [v for v in VULNERABILITIES if v["vulnerabilityID"] != "CVE-2024-10"]
+    new = _report(fixed + [{"vulnerabilityID": "CVE-2025-1", "severity": "CRITICAL"}], timestamp="t2")
+    new["data"]["report"]["vulnerabilities"][3]["severity"] = "LOW"
+    del new["_name"]
+
+    ops = diff(old, new)
+    assert apply_delta(copy.deepcopy(old), ops) == new
+    # The list change is limited to the edited range instead of the whole list
+    vulnerabilities = new["data"]["report"]["vulnerabilities"]
+    assert ["splice", ["data", "report", "vulnerabilities"], 3, 50, vulnerabilities[3:]] in ops
+    assert ["del", ["_name"]] in ops
+    assert diff(new, new) == []
+    assert apply_delta({"a": 1}, diff({"a": 1}, [1, 2])) == [1, 2]
+
+
+def test_diff_recurses_into_single_changed_list_item():
+    old = _report(VULNERABILITIES)
+    new = copy.deepcopy(old)
+    new["data"]["report"]["vulnerabilities"][7]["severity"] = "LOW"
+    assert diff(old, new) == [["set", ["data", "report", "vulnerabilities", 7, "severity"], "LOW"]]
+
+
+def test_recorder_writes_snapshots_and_deltas():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, snapshot_every=3)
+
+    docs = [_report(VULNERABILITIES[: 40 + i], timestamp=f"t{i}") for i in range(5)]
+    for i, doc in enumerate(docs):
+        assert recorder.write("vulnerabilityreports", "uid-1", doc, T0 + timedelta(hours=i))
+    # Unchanged versions are not recorded
+    assert not recorder.write("vulnerabilityreports", "uid-1", docs[-1], T0 + timedelta(hours=5))
+
+    kinds = [client.entries[("uid-1", v)]["kind"] for v in range(1, 6)]
+    assert kinds == [SNAPSHOT, DELTA, DELTA, SNAPSHOT, DELTA]
+
+    store = HistoryStore(client)
+    for version, doc in enumerate(docs, start=1):
+        assert store.get_version("uid-1", version) == doc
+    assert store.get_at("uid-1", T0 + timedelta(hours=2, minutes=30)) == docs[2]
+    assert store.get_at("uid-1", T0 - timedelta(hours=1)) is None
+
+
+def test_recorder_resumes_chain_from_store():
+    client = FakeHistoryClient()
+    HistoryRecorder(client).write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES), T0)
+
+    # A new process has nothing cached and continues after the stored version
+    recorder = HistoryRecorder(client)
+    assert recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES, "t2"), T0 + timedelta(hours=1))
+    assert client.entries[("uid-1", 2)]["kind"] == DELTA
+    assert HistoryStore(client).get_version("uid-1", 2) == _report(VULNERABILITIES, "t2")
+
+
+def test_deletion_and_recreation():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client)
+    recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES), T0)
+    assert recorder.write("vulnerabilityreports", "uid-1", None, T0 + timedelta(hours=1))
+    assert not recorder.write("vulnerabilityreports", "uid-1", None, T0 + timedelta(hours=2))
+    recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[:5]), T0 + timedelta(hours=3))
+
+    assert [client.entries[("uid-1", v)]["kind"] for v in (1, 2, 3)] == [SNAPSHOT, DELETED, SNAPSHOT]
+    assert HistoryStore(client).get_version("uid-1", 2) is None
+
+
+def test_get_range_replays_versions_in_window():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, snapshot_every=100)
+    docs = [_report(VULNERABILITIES[:i], timestamp=f"t{i}") for i in range(10, 20)]
+    for i, doc in enumerate(docs):
+        recorder.write("vulnerabilityreports", "uid-1", doc, T0 + timedelta(hours=i))
+
+    versions = HistoryStore(client).get_range("uid-1", T0 + timedelta(hours=3), T0 + timedelta(hours=5))
+    assert [v["version"] for v in versions] == [4, 5, 6]
+    assert [v["doc"] for v in versions] == docs[3:6]
+
+
+def test_record_drops_versions_when_queue_is_full():
+    recorder = HistoryRecorder(FakeHistoryClient(), queue_size=1)
+    recorder.record("vulnerabilityreports", "uid-1", {"a": 1})
+    recorder.record("vulnerabilityreports", "uid-1", {"a": 2})
+    assert recorder.dropped == 1
+
+
+def test_record_many_waits_for_queue_space():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, queue_size=1, bulk_timeout=5)
+    recorder.start()
+    try:
+        recorder.record_many([("vulnerabilityreports", f"uid-{i}", _report(VULNERABILITIES[:i])) for i in range(20)])
+    finally:
+        recorder.stop()
+    assert recorder.dropped == 0
+    assert len(client.entries) == 20
+
+
+def test_record_many_drops_the_rest_after_timeout():
+    recorder = HistoryRecorder(FakeHistoryClient(), queue_size=2, bulk_timeout=0.05)
+    recorder.record_many([("vulnerabilityreports", f"uid-{i}", {"i": i}) for i in range(5)])
+    assert recorder.dropped == 3
+
+
+def test_uncached_uid_costs_at_most_two_queries():
+    client = FakeHistoryClient()
+    for i, doc in enumerate([_report(VULNERABILITIES[:10]), _report(VULNERABILITIES[:11])]):
+        HistoryRecorder(client).write("vulnerabilityreports", "uid-1", doc, T0 + timedelta(hours=i))
+
+    calls = []
+    for name in ("find_history_version", "load_history"):
+        method = getattr(client, name)
+        setattr(client, name, lambda *args, _m=method, _n=name, **kwargs: calls.append(_n) or _m(*args, **kwargs))
+    recorder = HistoryRecorder(client)
+    recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[:12]), T0 + timedelta(hours=2))
+    recorder.write("vulnerabilityreports", "uid-new", _report(VULNERABILITIES), T0)
+
+    assert calls == ["find_history_version", "load_history", "find_history_version"]
+    assert HistoryStore(client).get_version("uid-1", 3) == _report(VULNERABILITIES[:12])
+
+
+def test_recorder_thread_writes_queued_versions():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client)
+    recorder.start()
+    recorder.record("vulnerabilityreports", "uid-1", _report(VULNERABILITIES))
+    recorder.stop()
+    assert HistoryStore(client).get_version("uid-1", 1) == _report(VULNERABILITIES)
+
+
+def test_compaction_materializes_new_chain_start():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, snapshot_every=100)
+    docs = [_report(VULNERABILITIES[:i], timestamp=f"t{i}") for i in range(10, 20)]
+    for i, doc in enumerate(docs):
+        recorder.write("vulnerabilityreports", "uid-1", doc, T0 + timedelta(days=i))
+
+    compactor = HistoryCompactor(client, retention_seconds=4.5 * 86400, max_versions=1000)
+    deleted = compactor.compact(now=T0 + timedelta(days=9))
+
+    # Versions recorded more than 4.5 days before "now" are gone
+    assert deleted == 5
+    assert sorted(v for _, v in client.entries) == [6, 7, 8, 9, 10]
+    assert client.entries[("uid-1", 6)]["kind"] == SNAPSHOT
+    store = HistoryStore(client)
+    for version in range(6, 11):
+        assert store.get_version("uid-1", version) == docs[version - 1]
+
+
+def test_compaction_limits_versions_and_drops_expired_deletions():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, snapshot_every=100)
+    for i in range(10):
+        recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[: 10 + i]), T0 + timedelta(hours=i))
+    recorder.write("vulnerabilityreports", "uid-2", _report(VULNERABILITIES), T0)
+    recorder.write("vulnerabilityreports", "uid-2", None, T0 + timedelta(hours=1))
+    recorder.write("vulnerabilityreports", "uid-3", _report(VULNERABILITIES), T0)
+
+    compactor = HistoryCompactor(client, retention_seconds=86400, max_versions=3)
+    compactor.compact(now=T0 + timedelta(days=30))
+
+    assert sorted(v for u, v in client.entries if u == "uid-1") == [10]
+    # An expired deletion removes the whole chain, a live resource keeps its latest version
+    assert not [key for key in client.entries if key[0] == "uid-2"]
+    assert HistoryStore(client).get_version("uid-3", 1) == _report(VULNERABILITIES)
+    assert HistoryStore(client).get_version("uid-1", 10) == _report(VULNERABILITIES[:19])
+
+    compactor = HistoryCompactor(client, retention_seconds=10 * 86400, max_versions=3)
+    recorder.write("vulnerabilityreports", "uid-4", _report(VULNERABILITIES[:1]), T0)
+    for i in range(2, 7):
+        recorder.write("vulnerabilityreports", "uid-4", _report(VULNERABILITIES[:i]), T0)
+    compactor.compact(now=T0)
+    assert sorted(v for u, v in client.entries if u == "uid-4") == [4, 5, 6]
+
+
+def test_cli_times_without_zone_are_utc():
+    assert _utc_datetime("2026-01-01") == T0
+    assert _utc_datetime("2026-01-01T02:00:00+02:00") == T0
+
+
+def test_get_range_only_loads_versions_up_to_until():
+    client = FakeHistoryClient()
+    recorder = HistoryRecorder(client, snapshot_every=100)
+    for i in range(10):
+        recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[: 10 + i]), T0 + timedelta(hours=i))
+
+    loads = []
+    load_history = client.load_history
+    client.load_history = lambda *args: loads.append(args) or load_history(*args)
+    store = HistoryStore(client)
+    assert [v["version"] for v in store.get_range("uid-1", T0 + timedelta(hours=2), T0 + timedelta(hours=3))] == [3, 4]
+    assert loads == [("uid-1", 1, 4)]
+    assert store.get_range("uid-1", T0 - timedelta(hours=2), T0 - timedelta(hours=1)) == []
+
+
+def test_head_lookup_survives_concurrent_compaction():
+    client = FakeHistoryClient()
+    HistoryRecorder(client).write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES), T0)
+    HistoryRecorder(client).write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[:3]), T0)
+
+    # The first load finds nothing because the compactor moved the chain start in between
+    load_history = client.load_history
+    calls = []
+
+    def compacted_once(*args):
+        calls.append(args)
+        return [] if len(calls) == 1 else load_history(*args)
+
+    client.load_history = compacted_once
+    recorder = HistoryRecorder(client)
+    assert recorder.write("vulnerabilityreports", "uid-1", _report(VULNERABILITIES[:4]), T0)
+    assert len(calls) == 2
+    assert client.entries[("uid-1", 3)]["kind"] == DELTA
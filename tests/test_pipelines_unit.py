@@ -0,0 +1,185 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from pipelines import PipelineFull, WritePipeline, WritePipelines
+
+
+def test_queued_upserts_are_written_as_one_bulk_call():
+    client = MagicMock()
+    client.bulk_upsert_resources.return_value = True
+    pipeline = WritePipeline("pods", client, workers=1, batch_size=10, max_backlog=10)
+
+    futures = [pipeline.submit("upsert_resource", "pods", f"uid-{i}", {"i": i}) for i in range(3)]
+    pipeline.start()
+    try:
+        assert [f.result(timeout=5) for f in futures] == [True, True, True]
+    finally:
+        pipeline.stop()
+
+    client.bulk_upsert_resources.assert_called_once_with(
+        [("pods", "uid-0", {"i": 0}), ("pods", "uid-1", {"i": 1}), ("pods", "uid-2", {"i": 2})]
+    )
+    assert pipeline.stats()["completed"] == 3
+
+
+def test_deletes_keep_their_position_in_a_batch():
+    calls = []
+    client = MagicMock()
+    client.upsert_resource.side_effect = lambda *args: calls.append(("upsert", args[1])) or True
+    client.delete_resource.side_effect = lambda *args: calls.append(("delete", args[1])) or True
+    client.bulk_upsert_resources.side_effect = lambda rows: calls.append(("bulk", [r[1] for r in rows])) or True
+    pipeline = WritePipeline("pods", client, workers=1, batch_size=10, max_backlog=10)
+
+    pipeline.submit("upsert_resource", "pods", "a", {})
+    pipeline.submit("upsert_resource", "pods", "b", {})
+    pipeline.submit("delete_resource", "pods", "a")
+    last = pipeline.submit("upsert_resource", "pods", "c", {})
+    pipeline.start()
+    try:
+        last.result(timeout=5)
+    finally:
+        pipeline.stop()
+
+    assert calls == [("bulk", ["a", "b"]), ("delete", "a"), ("upsert", "c")]
+
+
+@pytest.mark.parametrize("bulk_failure", [False, RuntimeError("BulkWriteError")])
+def test_failed_bulk_write_only_fails_the_bad_document(bulk_failure):
+    client = MagicMock()
+    if isinstance(bulk_failure, Exception):
+        client.bulk_upsert_resources.side_effect = bulk_failure
+    else:
+        client.bulk_upsert_resources.return_value = bulk_failure
+    client.upsert_resource.side_effect = lambda resource_type, uid, doc: uid != "bad"
+    pipeline = WritePipeline("pods", client, workers=1, batch_size=10, max_backlog=10)
+
+    futures = [pipeline.submit("upsert_resource", "pods", uid, {}) for uid in ("a", "bad", "c")]
+    pipeline.start()
+    try:
+        assert [f.result(timeout=5) for f in futures] == [True, False, True]
+    finally:
+        pipeline.stop()
+    assert client.upsert_resource.call_count == 3
+
+
+def test_full_backlog_rejects_immediately():
+    pipeline = WritePipeline("pods", MagicMock(), workers=1, batch_size=1, max_backlog=1)
+    pipeline.submit("delete_resource", "pods", "uid-1")
+
+    with pytest.raises(PipelineFull):
+        pipeline.submit("delete_resource", "pods", "uid-2")
+    assert pipeline.stats()["rejected"] == 1
+
+
+def test_stop_fails_queued_writes():
+    client = MagicMock()
+    started = threading.Event()
+    release = threading.Event()
+    client.delete_resource.side_effect = lambda *args: started.set() or release.wait(5)
+    pipeline = WritePipeline("pods", client, workers=1, batch_size=1, max_backlog=10)
+    pipeline.start()
+
+    first = pipeline.submit("delete_resource", "pods", "uid-0")
+    assert started.wait(5)
+    queued = [pipeline.submit("delete_resource", "pods", f"uid-{i}") for i in range(1, 5)]
+    stopper = threading.Thread(target=pipeline.stop)
+    stopper.start()
+    # Let the running write finish only once stop() has been requested
+    while not pipeline._stop.is_set():
+        time.sleep(0.01)
+    release.set()
+    stopper.join(5)
+
+    assert first.result(timeout=5) is True
+    for future in queued:
+        with pytest.raises(PipelineFull):
+            future.result(timeout=5)
+
+
+def test_write_errors_reach_the_caller():
+    client = MagicMock()
+    client.delete_resource.side_effect = RuntimeError("Database not connected")
+    pipeline = WritePipeline("pods", client, workers=1)
+    pipeline.start()
+    try:
+        with pytest.raises(RuntimeError):
+            pipeline.submit("delete_resource", "pods", "uid-1").result(timeout=5)
+    finally:
+        pipeline.stop()
+
+
+def test_heavy_type_does_not_delay_other_pipelines():
+    release = threading.Event()
+    client = MagicMock()
+    client.upsert_resource.side_effect = lambda resource_type, uid, doc: release.wait(5)
+    client.upsert_namespace.return_value = True
+
+    pipelines = WritePipelines(
+        client,
+        config={"vulnerabilityreports": {"workers": 1, "batch_size": 1, "max_backlog": 1}},
+        stats_interval=60,
+    )
+    pipelines.start()
+    try:
+        blocked = threading.Thread(
+            target=pipelines.upsert_resource, args=("vulnerabilityreports", "vr-1", {}), daemon=True
+        )
+        blocked.start()
+        # The namespace pipeline keeps writing while vulnerability reports are stuck
+        assert pipelines.upsert_namespace("ns-1", {}) is True
+        assert blocked.is_alive()
+    finally:
+        release.set()
+        pipelines.stop()
+
+    stats = pipelines.stats()
+    assert set(stats) == {"default", "namespace", "vulnerabilityreports"}
+    assert stats["namespace"]["completed"] == 1
+
+
+def test_unknown_pipeline_setting_is_rejected():
+    with pytest.raises(RuntimeError):
+        WritePipelines(MagicMock(), config={"pods": {"threads": 4}})
+
+
+def test_thread_budget_covers_every_backlog():
+    pipelines = WritePipelines(
+        MagicMock(),
+        config={
+            "default": {"workers": 2, "batch_size": 4, "max_backlog": 10},
+            "namespace": {"workers": 1, "batch_size": 1, "max_backlog": 5},
+        },
+    )
+    # Every worker can hold a full batch of blocked callers on top of the backlog
+    assert pipelines.thread_budget == 2 * 4 + 10 + 1 * 1 + 5
+
+
+def test_each_pipeline_gets_its_own_client():
+    shared = MagicMock()
+    clients = []
+
+    def factory():
+        client = MagicMock()
+        client.upsert_namespace.return_value = True
+        client.delete_resource.return_value = True
+        clients.append(client)
+        return client
+
+    pipelines = WritePipelines(shared, config={"vulnerabilityreports": {}}, client_factory=factory)
+    assert len(clients) == 3
+    pipelines.start()
+    try:
+        assert pipelines.upsert_namespace("ns-1", {}) is True
+        assert pipelines.delete_resource("vulnerabilityreports", "uid-1") is True
+    finally:
+        pipelines.stop()
+
+    assert all(c.connect.called and c.disconnect.called for c in clients)
+    # Namespace and vulnerability report writes went through different clients
+    (ns_client,) = [c for c in clients if c.upsert_namespace.called]
+    (vr_client,) = [c for c in clients if c.delete_resource.called]
+    assert ns_client is not vr_client
+    shared.upsert_namespace.assert_not_called()
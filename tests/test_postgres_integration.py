@@ -1,9 +1,13 @@
 import os
 import time
+from datetime import datetime, timedelta, timezone
 import pytest
 import psycopg2
 from psycopg2.extras import Json
 
+from database import PostgresDatabaseClient
+from history import HistoryCompactor, HistoryRecorder, HistoryStore
+
 
 def wait_for_postgres(dsn, timeout=30):
     start = time.time()
@@ -18,6 +22,24 @@ def wait_for_postgres(dsn, timeout=30):
             time.sleep(0.5)
 
 
+def postgres_settings():
+    # Use docker-compose postgres service defaults
+    return {
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": int(os.getenv("POSTGRES_PORT", "5433")),
+        "db_name": os.getenv("POSTGRES_DB", "shield"),
+        "user": os.getenv("POSTGRES_USER", "shield"),
+        "password": os.getenv("POSTGRES_PASSWORD", "password"),
+    }
+
+
+def postgres_dsn(settings):
+    return (
+        f"host={settings['host']} port={settings['port']} dbname={settings['db_name']} "
+        f"user={settings['user']} password={settings['password']}"
+    )
+
+
 def test_upsert_and_delete_resource_with_postgres():
     # Use docker-compose postgres service defaults
     host = os.getenv("POSTGRES_HOST", "localhost")
@@ -77,3 +99,87 @@ def test_upsert_and_delete_resource_with_postgres():
 
     finally:
         conn.close()
+
+
+# Below and above COPY_MIN_ROWS, so both the INSERT and the COPY path are covered
+@pytest.mark.parametrize("count", [50, 1500])
+def test_bulk_upsert_resources_with_postgres_integration(count):
+    settings = postgres_settings()
+    if not wait_for_postgres(postgres_dsn(settings), timeout=3):
+        pytest.skip("Postgres not available, skipping integration test")
+
+    client = PostgresDatabaseClient(**settings)
+    client.connect()
+    try:
+        rows = [("bulk-test", f"bulk-{i}", {"_name": f"r{i}", "data": {"text": 'a,"b"\n'}}) for i in range(count)]
+        # Later rows for the same uid win
+        rows.append(("bulk-test", "bulk-0", {"_name": "latest", "data": {}}))
+        assert client.bulk_upsert_resources(rows) is True
+
+        with client.conn.cursor() as cur:
+            cur.execute("SELECT count(*) FROM resources WHERE resource_type = 'bulk-test'")
+            assert cur.fetchone()[0] == count
+            cur.execute("SELECT data FROM resources WHERE uid = 'bulk-1'")
+            assert cur.fetchone()[0]["data"]["text"] == 'a,"b"\n'
+            cur.execute("SELECT data->>'_name' FROM resources WHERE uid = 'bulk-0'")
+            assert cur.fetchone()[0] == "latest"
+            cur.execute("DELETE FROM resources WHERE resource_type = 'bulk-test'")
+    finally:
+        client.disconnect()
+
+
+def test_dedup_reports_with_postgres_integration():
+    settings = postgres_settings()
+    if not wait_for_postgres(postgres_dsn(settings), timeout=3):
+        pytest.skip("Postgres not available, skipping integration test")
+
+    client = PostgresDatabaseClient(**settings, dedup_reports=True)
+    client.dedup_min_bytes = 10
+    client.connect()
+    try:
+        vulnerabilities = [{"vulnerabilityID": f"CVE-2024-{i}"} for i in range(10)]
+        docs = {
+            f"dedup-{i}": {"data": {"report": {"updateTimestamp": str(i), "vulnerabilities": vulnerabilities}}}
+            for i in range(3)
+        }
+        for uid, doc in docs.items():
+            assert client.upsert_resource("dedup-test", uid, doc) is True
+
+        assert client.get_resource("dedup-test", "dedup-1") == docs["dedup-1"]
+        assert dict(client.iter_resources("dedup-test")) == docs
+        # Referenced blobs survive collection, orphaned ones do not
+        assert client.collect_report_blobs(0) == 0
+        with client.conn.cursor() as cur:
+            cur.execute("DELETE FROM resources WHERE resource_type = 'dedup-test'")
+        assert client.collect_report_blobs(0) == 1
+    finally:
+        client.disconnect()
+
+
+def test_history_with_postgres_integration():
+    settings = postgres_settings()
+    if not wait_for_postgres(postgres_dsn(settings), timeout=3):
+        pytest.skip("Postgres not available, skipping integration test")
+
+    client = PostgresDatabaseClient(**settings)
+    client.connect()
+    try:
+        with client.conn.cursor() as cur:
+            cur.execute("DELETE FROM resource_history WHERE uid = 'history-1'")
+        start = datetime.now(timezone.utc)
+        recorder = HistoryRecorder(client, snapshot_every=3)
+        docs = [{"data": {"vulnerabilities": [{"id": f"CVE-{n}"} for n in range(i + 5)]}} for i in range(5)]
+        for i, doc in enumerate(docs):
+            assert recorder.write("history-test", "history-1", doc, start + timedelta(minutes=i))
+
+        store = HistoryStore(client)
+        assert [store.get_version("history-1", v) for v in range(1, 6)] == docs
+        window = store.get_range("history-1", start + timedelta(minutes=1), start + timedelta(minutes=2))
+        assert [v["doc"] for v in window] == docs[1:3]
+
+        compactor = HistoryCompactor(client, retention_seconds=86400, max_versions=2)
+        assert compactor.compact() == 3
+        assert store.get_version("history-1", 4) == docs[3]
+        assert store.get_version("history-1", 3) is None
+    finally:
+        client.disconnect()
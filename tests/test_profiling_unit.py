@@ -0,0 +1,31 @@
+import threading
+import time
+
+import profiling
+
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+def test_capture_profile_writes_collapsed_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        path = profiling.capture_profile(duration=0.1, output_dir=str(tmp_path), interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = open(path).read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any(line.startswith("busy;") and "test_profiling_unit:_busy_worker" in line for line in lines)
+
+
+def test_capture_profile_ignores_concurrent_requests(tmp_path):
+    with profiling._capture_lock:
+        assert profiling.capture_profile(duration=0, output_dir=str(tmp_path)) is None
@@ -0,0 +1,81 @@
+from report_blobs import BLOBS_FIELD, BlobCache, RecentBlobs, assemble_report, split_report
+
+
+def _report_doc(timestamp, vulnerabilities):
+    return {
+        "_name": "replicaset-app-123",
+        "data": {
+            "report": {
+                "artifact": {"digest": "sha256:abc"},
+                "updateTimestamp": timestamp,
+                "vulnerabilities": vulnerabilities,
+                "summary": {"criticalCount": 1},
+            }
+        },
+    }
+
+
+VULNERABILITIES = [{"vulnerabilityID": f"CVE-2024-{i}", "severity": "HIGH"} for i in range(50)]
+
+
+def test_replicas_share_one_blob():
+    doc_a, blobs_a = split_report(_report_doc("t1", VULNERABILITIES), min_bytes=100)
+    doc_b, blobs_b = split_report(_report_doc("t2", VULNERABILITIES), min_bytes=100)
+
+    assert blobs_a.keys() == blobs_b.keys()
+    (key,) = blobs_a
+    assert key.startswith("sha256:abc:")
+    assert doc_a["data"]["report"]["vulnerabilities"] == {"_blob": key}
+    assert doc_a[BLOBS_FIELD] == [key]
+    # Small sections stay inline
+    assert doc_a["data"]["report"]["summary"] == {"criticalCount": 1}
+
+
+def test_split_does_not_modify_input_and_assembles_back():
+    original = _report_doc("t1", VULNERABILITIES)
+    stored, blobs = split_report(original, min_bytes=100)
+
+    assert original["data"]["report"]["vulnerabilities"] == VULNERABILITIES
+    assert assemble_report(stored, blobs.get) == original
+
+
+def test_small_or_missing_reports_are_left_alone():
+    doc = _report_doc("t1", VULNERABILITIES[:1])
+    assert split_report(doc, min_bytes=10000) == (doc, {})
+    namespace = {"_name": "default", "data": {"metadata": {}}}
+    assert split_report(namespace, min_bytes=0) == (namespace, {})
+    assert assemble_report(namespace, lambda key: None) is namespace
+
+
+def test_missing_blob_leaves_reference():
+    stored, blobs = split_report(_report_doc("t1", VULNERABILITIES), min_bytes=100)
+    assembled = assemble_report(stored, lambda key: None)
+    assert assembled["data"]["report"]["vulnerabilities"] == {"_blob": next(iter(blobs))}
+
+
+def test_recent_blobs_skips_rewrites_within_ttl():
+    recent = RecentBlobs(ttl_seconds=60)
+    assert recent.unwritten(["a", "b"]) == ["a", "b"]
+    recent.mark_written(["a"])
+    assert recent.unwritten(["a", "b"]) == ["b"]
+
+    expired = RecentBlobs(ttl_seconds=0)
+    expired.mark_written(["a"])
+    assert expired.unwritten(["a"]) == ["a"]
+
+
+def test_blob_cache_only_keeps_hits():
+    stored = {}
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        return stored.get(key)
+
+    cache = BlobCache(load, maxsize=1)
+    assert cache("a") is None
+    stored["a"] = [1]
+    # A miss is not remembered, so a blob written later is found
+    assert cache("a") == [1]
+    assert cache("a") == [1]
+    assert loads == ["a", "a"]
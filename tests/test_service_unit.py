@@ -133,3 +133,124 @@ def test_syncnamespace_no_uid(mock_db_client):
 
     assert resp.success is False
     assert resp.message == "No UID provided"
+
+
+@patch("grpc_receiver_service.lease_tracker")
+def test_heartbeat_renews_lease(mock_lease_tracker):
+    mock_lease_tracker.heartbeat.return_value = True
+
+    servicer = SyncServiceServicer()
+    resp = servicer.Heartbeat(sync_service_pb2.HeartbeatRequest(cluster="test-cluster"), DummyContext())
+
+    assert resp.success is True
+    mock_lease_tracker.heartbeat.assert_called_once_with("test-cluster")
+
+
+def test_heartbeat_no_cluster():
+    servicer = SyncServiceServicer()
+    resp = servicer.Heartbeat(sync_service_pb2.HeartbeatRequest(cluster=""), DummyContext())
+
+    assert resp.success is False
+    assert resp.message == "No cluster provided"
+
+
+@patch("grpc_receiver_service.lease_tracker")
+@patch("grpc_receiver_service.db_client")
+def test_syncresource_observes_cluster(mock_db_client, mock_lease_tracker):
+    req = sync_service_pb2.SyncResourceRequest(
+        event_type="ADDED",
+        resource_type="pod",
+        name="mypod",
+        cluster="test-cluster",
+        uid="uid-123",
+        data_json=json.dumps({}),
+    )
+    mock_db_client.upsert_resource.return_value = True
+
+    SyncServiceServicer().SyncResource(req, DummyContext())
+
+    mock_lease_tracker.observe.assert_called_once_with("test-cluster")
+
+
+@patch("grpc_receiver_service.lease_tracker")
+@patch("grpc_receiver_service.history_recorder")
+@patch("grpc_receiver_service.INITIAL_SYNC_BATCH_SIZE", 2)
+@patch("grpc_receiver_service.db_client")
+def test_initialsync_writes_in_batches(mock_db_client, mock_history_recorder, mock_lease_tracker):
+    items = [
+        sync_service_pb2.InitialSyncRequest(
+            resource=sync_service_pb2.SyncResourceRequest(
+                event_type="ADDED",
+                resource_type="pod",
+                name=f"pod-{i}",
+                cluster="test-cluster",
+                uid=f"uid-{i}",
+                data_json=json.dumps({"i": i}),
+            )
+        )
+        for i in range(3)
+    ]
+    items.append(
+        sync_service_pb2.InitialSyncRequest(
+            namespace=sync_service_pb2.SyncNamespaceRequest(
+                event_type="ADDED", name="default", cluster="test-cluster", uid="ns-1", data_json="{}"
+            )
+        )
+    )
+    mock_db_client.bulk_upsert_resources.return_value = True
+    mock_db_client.bulk_upsert_namespaces.return_value = True
+    recorded = []
+    # The batch list is reused after the call, so keep a copy of its rows
+    mock_history_recorder.record_many.side_effect = recorded.extend
+
+    servicer = SyncServiceServicer()
+    resp = servicer.InitialSync(iter(items), DummyContext())
+
+    assert resp.success is True
+    assert (resp.resources, resp.namespaces) == (3, 1)
+    assert mock_db_client.bulk_upsert_resources.call_count == 2
+    # Bulk rows go to the history with backpressure, one call per batch
+    assert mock_history_recorder.record_many.call_count == 2
+    assert [uid for _, uid, _ in recorded] == ["uid-0", "uid-1", "uid-2"]
+
+
+@patch("grpc_receiver_service.lease_tracker")
+@patch("grpc_receiver_service.db_client")
+def test_initialsync_reports_failed_bulk_write(mock_db_client, mock_lease_tracker):
+    item = sync_service_pb2.InitialSyncRequest(
+        resource=sync_service_pb2.SyncResourceRequest(
+            event_type="ADDED", resource_type="pod", name="mypod", uid="uid-1", data_json="{}"
+        )
+    )
+    mock_db_client.bulk_upsert_resources.return_value = False
+
+    servicer = SyncServiceServicer()
+    resp = servicer.InitialSync(iter([item]), DummyContext())
+
+    assert resp.success is False
+    assert resp.resources == 0
+
+
+@patch("grpc_receiver_service.lease_tracker")
+@patch("grpc_receiver_service.history_recorder")
+@patch("grpc_receiver_service.db_client")
+def test_syncresource_records_history(mock_db_client, mock_history_recorder, mock_lease_tracker):
+    mock_db_client.upsert_resource.return_value = True
+    mock_db_client.delete_resource.return_value = True
+    servicer = SyncServiceServicer()
+
+    for event_type in ("MODIFIED", "DELETED"):
+        req = sync_service_pb2.SyncResourceRequest(
+            event_type=event_type,
+            resource_type="vulnerabilityreports",
+            name="report",
+            cluster="test-cluster",
+            uid="uid-123",
+            data_json=json.dumps({"foo": "bar"}),
+        )
+        assert servicer.SyncResource(req, DummyContext()).success is True
+
+    (upsert, delete) = mock_history_recorder.record.call_args_list
+    assert upsert.args[:2] == ("vulnerabilityreports", "uid-123")
+    assert upsert.args[2]["data"] == {"foo": "bar"}
+    assert delete.args == ("vulnerabilityreports", "uid-123", None)
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from store_transfer import default_checkpoint, export_store, import_store
+
+
+class InMemoryClient:
+    def __init__(self, resources=None, namespaces=None, db_name="shield"):
+        self.db_name = db_name
+        self.resources = resources or {}
+        self.namespaces = namespaces or {}
+        self.bulk_calls = 0
+
+    def list_resource_types(self):
+        return sorted(self.resources)
+
+    def iter_resources(self, resource_type, batch_size=1000):
+        yield from self.resources[resource_type].items()
+
+    def iter_namespaces(self, batch_size=1000):
+        yield from self.namespaces.items()
+
+    def bulk_upsert_resources(self, rows):
+        self.bulk_calls += 1
+        for resource_type, uid, doc in rows:
+            self.resources.setdefault(resource_type, {})[uid] = doc
+        return True
+
+    def bulk_upsert_namespaces(self, rows):
+        self.bulk_calls += 1
+        for uid, doc in rows:
+            self.namespaces[uid] = doc
+        return True
+
+
+def _source():
+    return InMemoryClient(
+        resources={
+            "vulnerabilityreports": {f"vr-{i}": {"_name": f"r{i}", "data": {"n": i}} for i in range(5)},
+            "configauditreports": {"ca-1": {"_name": "c1", "data": {}}},
+        },
+        namespaces={"ns-1": {"_name": "default"}},
+    )
+
+
+def test_export_import_roundtrip(tmp_path):
+    source = _source()
+    manifest = export_store(source, str(tmp_path), chunk_rows=2, workers=2)
+
+    assert [c["rows"] for c in manifest["resources"]["vulnerabilityreports"]] == [2, 2, 1]
+    assert os.path.exists(tmp_path / "resources" / "vulnerabilityreports" / "part-00002.ndjson.gz")
+
+    target = InMemoryClient()
+    counts = import_store(target, str(tmp_path), workers=2)
+
+    assert counts == {"vulnerabilityreports": 5, "configauditreports": 1, "namespace": 1}
+    assert target.resources == source.resources
+    assert target.namespaces == source.namespaces
+
+
+def test_import_resumes_from_checkpoint(tmp_path):
+    export_store(_source(), str(tmp_path), chunk_rows=2)
+    target = InMemoryClient()
+    with open(default_checkpoint(str(tmp_path), target), "w") as f:
+        f.write("resources/vulnerabilityreports/part-00000.ndjson.gz\n")
+
+    counts = import_store(target, str(tmp_path))
+
+    assert counts["vulnerabilityreports"] == 3
+    assert sorted(target.resources["vulnerabilityreports"]) == ["vr-2", "vr-3", "vr-4"]
+
+    # Everything is checkpointed now, so a second run writes nothing
+    again = InMemoryClient()
+    assert sum(import_store(again, str(tmp_path)).values()) == 0
+    assert again.bulk_calls == 0
+
+
+def test_import_into_another_database_ignores_checkpoint(tmp_path):
+    export_store(_source(), str(tmp_path), chunk_rows=2)
+    import_store(InMemoryClient(db_name="shield"), str(tmp_path))
+
+    other = InMemoryClient(db_name="benchmark")
+    counts = import_store(other, str(tmp_path))
+    assert counts == {"vulnerabilityreports": 5, "configauditreports": 1, "namespace": 1}
+
+
+def test_export_refuses_non_empty_directory(tmp_path):
+    export_store(_source(), str(tmp_path))
+    with pytest.raises(RuntimeError):
+        export_store(_source(), str(tmp_path))
+
+
+def test_import_failed_chunk_is_not_checkpointed(tmp_path):
+    export_store(_source(), str(tmp_path), chunk_rows=10)
+    target = InMemoryClient()
+    target.bulk_upsert_namespaces = lambda rows: False
+
+    with pytest.raises(RuntimeError):
+        import_store(target, str(tmp_path), workers=1)
+    with open(default_checkpoint(str(tmp_path), target)) as f:
+        done = f.read().splitlines()
+    assert "namespaces/part-00000.ndjson.gz" not in done
+    assert "resources/vulnerabilityreports/part-00000.ndjson.gz" in done
+
+
+def test_import_requires_manifest(tmp_path):
+    with pytest.raises(RuntimeError):
+        import_store(InMemoryClient(), str(tmp_path))
+
+
+def test_manifest_is_json(tmp_path):
+    export_store(_source(), str(tmp_path))
+    with open(tmp_path / "manifest.json") as f:
+        assert json.load(f)["version"] == 1
@@ -0,0 +1,46 @@
+import json
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import tracing
+
+
+def test_tracing_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("TRACING_EXPORTER", raising=False)
+    assert tracing.init_tracing() is False
+    assert isinstance(tracing.span("json.decode"), nullcontext)
+    assert isinstance(tracing.server_span("SyncResource", MagicMock()), nullcontext)
+
+
+def test_tracing_unsupported_exporter(monkeypatch):
+    pytest.importorskip("opentelemetry.sdk")
+    monkeypatch.setenv("TRACING_EXPORTER", "bogus")
+    with pytest.raises(RuntimeError):
+        tracing.init_tracing()
+
+
+def test_file_exporter_continues_controller_trace(tmp_path, monkeypatch):
+    pytest.importorskip("opentelemetry.sdk")
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACING_EXPORTER", "file")
+    monkeypatch.setenv("TRACING_FILE", str(trace_file))
+
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    context = MagicMock()
+    context.invocation_metadata.return_value = (("traceparent", f"00-{trace_id}-00f067aa0ba902b7-01"),)
+
+    # Use a private provider so the test does not depend on global tracer state
+    with patch("tracing.trace.set_tracer_provider"):
+        assert tracing.init_tracing() is True
+    out = tracing._trace_file
+    with tracing.server_span("SyncResource", context):
+        with tracing.span("json.decode"):
+            pass
+    tracing.shutdown_tracing()
+    assert out.closed
+
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert {s["name"] for s in spans} == {"SyncResource", "json.decode"}
+    assert all(s["context"]["trace_id"] == f"0x{trace_id}" for s in spans)
@@ -0,0 +1,104 @@
+"""Optional OpenTelemetry tracing for the gRPC receiver service.
+
+Tracing is disabled unless TRACING_EXPORTER is set:
+- "file": spans are appended as JSON lines to TRACING_FILE (default traces.jsonl)
+- "otlp": spans are sent to an OTLP collector (OTEL_EXPORTER_OTLP_ENDPOINT)
+
+The opentelemetry packages are an optional dependency. When they are not
+installed, or tracing is not configured, `server_span()` and `span()` return
+no-op context managers so the request path pays no tracing cost.
+"""
+
+import logging
+import os
+from contextlib import nullcontext
+from typing import Any
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.propagate import extract
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:  # opentelemetry is optional
+    trace = None
+
+logger = logging.getLogger("grpc-receiver")
+
+_provider = None
+_tracer = None
+# TRACING_FILE handle of the file exporter, closed by shutdown_tracing()
+_trace_file = None
+
+
+def init_tracing() -> bool:
+    """Configure span export from the environment.
+
+    Returns True when tracing was enabled.
+    """
+    global _provider, _tracer, _trace_file
+    exporter_name = os.getenv("TRACING_EXPORTER", "").lower()
+    if exporter_name in ("", "none"):
+        return False
+    if trace is None:
+        logger.warning("TRACING_EXPORTER is set but opentelemetry-sdk is not installed, tracing disabled")
+        return False
+
+    if exporter_name == "file":
+        path = os.getenv("TRACING_FILE", "traces.jsonl")
+        # Line buffered so spans are visible on disk as soon as they are exported
+        _trace_file = open(path, "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=_trace_file, formatter=lambda s: s.to_json(indent=None) + "\n")
+    elif exporter_name == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        exporter = OTLPSpanExporter()
+    else:
+        raise RuntimeError(f"Unsupported TRACING_EXPORTER: {exporter_name}")
+
+    service_name = os.getenv("OTEL_SERVICE_NAME", "shield-receiver")
+    _provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    _tracer = _provider.get_tracer("shield-receiver")
+    logger.info(f"Tracing enabled ({exporter_name} exporter)")
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans and stop exporting."""
+    global _provider, _tracer, _trace_file
+    if _provider is None:
+        return
+    _provider.shutdown()
+    _provider = None
+    _tracer = None
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+
+def server_span(name: str, context, attributes: dict[str, Any] | None = None):
+    """Start the root span of an RPC, continuing the caller's trace if one was sent.
+
+    The controller propagates its trace context as W3C `traceparent`/`tracestate`
+    entries in the gRPC metadata.
+    """
+    if _tracer is None:
+        return nullcontext()
+    metadata = getattr(context, "invocation_metadata", None)
+    carrier = {key: value for key, value in (metadata() if metadata else ()) or ()}
+    return _tracer.start_as_current_span(
+        name,
+        context=extract(carrier),
+        kind=trace.SpanKind.SERVER,
+        attributes=attributes,
+    )
+
+
+def span(name: str, attributes: dict[str, Any] | None = None):
+    """Start a child span of the current span."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)